@@ -1,6 +1,7 @@
 import os
 import requests
 from dotenv import load_dotenv
+from backend.app.resilience import timed_get
 
 # [thunderstorm, drizzle, rain], snow, clear, [atmosphere, clouds]
 
@@ -14,7 +15,10 @@ def fetch_weather_by_coords(lat, lon):
         "appid": os.getenv("OPENWEATHER_API_KEY"),
         "units": "metric"
     }
-    data = requests.get(url, params=params).json()
+    # Adaptive timeout, capped by the request deadline when called from the API
+    response = timed_get("openweather", requests, url, params=params)
+    response.raise_for_status()
+    data = response.json()
 
     conditions = data["weather"][0]["main"]
     if conditions in ["Thunderstorm", "Drizzle", "Rain"]:
@@ -26,5 +30,31 @@ def fetch_weather_by_coords(lat, lon):
     else:
         return "Sunny"
 
+# Nearby users share one lookup: coordinates snap to a grid cell and the
+# label is cached for everyone in that cell
+REGION_DEGREES = 0.5
+WEATHER_CACHE_TTL = 30 * 60
+_weather_cache = None
+
+def region_bucket(lat, lon, degrees=REGION_DEGREES):
+    return (round(lat / degrees) * degrees, round(lon / degrees) * degrees)
+
+def region_key(lat, lon):
+    bucket_lat, bucket_lon = region_bucket(lat, lon)
+    return f"{bucket_lat:.2f},{bucket_lon:.2f}"
+
+def fetch_weather_cached(lat, lon):
+    global _weather_cache
+    if _weather_cache is None:
+        from backend.app.cache import TieredCache
+        _weather_cache = TieredCache("weather")
+
+    key = region_key(lat, lon)
+    weather = _weather_cache.get(key)
+    if weather is None:
+        weather = fetch_weather_by_coords(*region_bucket(lat, lon))
+        _weather_cache.set(key, weather, ttl=WEATHER_CACHE_TTL)
+    return weather
+
 # TODO display conditions, temp, cloud cover, precipitation, icon also
 
@@ -3,17 +3,21 @@ from dotenv import load_dotenv
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from datetime import date
-from fetch_weather import fetch_weather_by_coords
+from backend.api.fetch_weather import fetch_weather_by_coords
 
+import numpy as np
 import pandas as pd
 import requests
+from backend.app.listening_history import ListeningHistory
+from backend.app.tracks import TrackBatch
 from ml.data import load_data, features as model_features
+from ml.feature_store import FeatureStore
 from ml.models import gradient_boosting
 
 load_dotenv()
 
-# Get weather via frontend (IP-based geolocation)
-weather = fetch_weather_by_coords(37.7749, -122.4194)
+# Run from the repo root: python -m backend.api.playlist_gen
+# The web API runs the same pipeline as a background job (backend/app/jobs.py)
 
 def get_user_spotify():
     return spotipy.Spotify(
@@ -26,22 +30,27 @@ def get_user_spotify():
         )
     )
 
-sp = get_user_spotify()
-user_id = sp.current_user()["id"]
-first_page = sp.current_user_recently_played(limit=50)
-items = list(first_page.get("items", []))
-if items:
-    last_played_at = items[-1].get("played_at")
-    if last_played_at:
-        before_ms = int(pd.Timestamp(last_played_at).timestamp() * 1000)
-        second_page = sp.current_user_recently_played(limit=50, before=before_ms)
-        items.extend(second_page.get("items", []))
-
-track_ids = [
-    item["track"]["id"]
-    for item in items
-    if item.get("track") and item["track"].get("id")
-]
+def fetch_recent_track_ids(sp, history=None, user_id=None):
+    # With a ListeningHistory only plays since the last sync are fetched and
+    # the user's whole known track set is returned
+    if history is not None:
+        history.sync(sp, user_id)
+        return history.track_ids(user_id)
+
+    first_page = sp.current_user_recently_played(limit=50)
+    items = list(first_page.get("items", []))
+    if items:
+        last_played_at = items[-1].get("played_at")
+        if last_played_at:
+            before_ms = int(pd.Timestamp(last_played_at).timestamp() * 1000)
+            second_page = sp.current_user_recently_played(limit=50, before=before_ms)
+            items.extend(second_page.get("items", []))
+
+    return [
+        item["track"]["id"]
+        for item in items
+        if item.get("track") and item["track"].get("id")
+    ]
 
 BASE_URL = "https://api.reccobeats.com"
 
@@ -53,7 +62,8 @@ def spotify_to_recco(track_id, session):
     )
     resp.raise_for_status()
     data = resp.json()
-    tracks = data.get("data", [])
+    # Reccobeats returns "content"; older responses used "data"
+    tracks = data.get("content") or data.get("data", [])
     if not tracks:
         return None
     return tracks[0].get("id")
@@ -67,51 +77,108 @@ def fetch_audio_features(recco_id, session):
         return None
     resp.raise_for_status()
     data = resp.json()
-    features = {f: data.get(f) for f in model_features}
-    if any(value is None for value in features.values()):
+    features = tuple(data.get(f) for f in model_features)
+    if any(value is None for value in features):
         return None
     return features
 
-def build_weather_playlist(candidate_track_ids, target_weather):
+def train_model():
     X, y = load_data()
     model = gradient_boosting()
     model.fit(X, y)
-    classes = list(model.named_steps["classifier"].classes_)
-    target_key = target_weather.lower()
-    if target_key not in classes:
-        target_key = classes[0]
-    target_idx = classes.index(target_key)
+    return model
 
+def model_predict_proba(model):
+    # Wrap a fitted pipeline as features -> (probability matrix, class labels)
+    classes = [str(c).lower() for c in model.classes_]
+
+    def predict_proba(features):
+        return model.predict_proba(pd.DataFrame(features, columns=model_features)), classes
+
+    return predict_proba
+
+def reccobeats_features():
+    # Read through the shared feature store, fetching only tracks it lacks
     session = requests.Session()
-    scored_tracks = []
-    for track_id in candidate_track_ids:
+    store = FeatureStore()
+
+    def get_features(track_id):
+        stored = store.get(track_id)
+        if stored is not None:
+            return stored
         recco_id = spotify_to_recco(track_id, session)
-        if not recco_id:
-            continue
-        feats = fetch_audio_features(recco_id, session)
-        if not feats:
-            continue
-        df = pd.DataFrame([feats], columns=model_features)
-        score = model.predict_proba(df)[0][target_idx]
-        scored_tracks.append((track_id, score))
-    scored_tracks.sort(key=lambda item: item[1], reverse=True)
-    return [track_id for track_id, _ in scored_tracks]
-
-personal_playlist = build_weather_playlist(track_ids, weather)
-
-
-
-username = sp.current_user()["display_name"]
-date_today = date.today().strftime("%Y-%m-%d")
-
-playlist = sp.user_playlist_create(
-    user=user_id,
-    name=f"{date_today} : {username}'s {weather} Day Playlist",
-    public=False
-)
-
-if personal_playlist:
-    sp.playlist_add_items(
-        playlist_id=playlist["id"],
-        items=personal_playlist[:5]
+        features = fetch_audio_features(recco_id, session) if recco_id else None
+        if features is not None:
+            store.upsert_many([(track_id, features)])
+        return features
+
+    return get_features
+
+def score_tracks(track_ids, predict_proba, get_features):
+    # One inference pass over every track that has features
+    batch = TrackBatch.from_pairs((track_id, get_features(track_id)) for track_id in track_ids)
+    if not len(batch):
+        return [], np.empty((0, 0)), []
+    probabilities, classes = predict_proba(batch.features)
+    return batch.track_ids, np.asarray(probabilities), [str(c).lower() for c in classes]
+
+def rank_by_weather(track_ids, probabilities, classes):
+    # Every weather's ranking from the same probability matrix
+    order = np.argsort(-probabilities, axis=0, kind="stable")
+    return {
+        weather: [track_ids[row] for row in order[:, column]]
+        for column, weather in enumerate(classes)
+    }
+
+def build_weather_playlists(candidate_track_ids, model=None, get_features=None, predict_proba=None):
+    # Ranked candidates for every weather type from a single scoring pass
+    if predict_proba is None:
+        predict_proba = model_predict_proba(model if model is not None else train_model())
+    return rank_by_weather(*score_tracks(candidate_track_ids, predict_proba, get_features or reccobeats_features()))
+
+def build_weather_playlist(candidate_track_ids, target_weather, model=None, get_features=None, known_scores=None, predict_proba=None):
+    # model: fitted pipeline (trained here if neither it nor predict_proba is given)
+    # get_features: spotify track id -> feature tuple or None (Reccobeats lookup if not given)
+    # known_scores: track id -> pre-computed target-weather probability; these skip fetch and scoring
+    # predict_proba: features -> (probability matrix, class labels), e.g. ModelLoader.predict_proba
+    if predict_proba is None:
+        predict_proba = model_predict_proba(model if model is not None else train_model())
+
+    known_scores = known_scores or {}
+    scored = [(track_id, known_scores[track_id]) for track_id in candidate_track_ids if track_id in known_scores]
+    remaining = [track_id for track_id in candidate_track_ids if track_id not in known_scores]
+
+    track_ids, probabilities, classes = score_tracks(remaining, predict_proba, get_features or reccobeats_features())
+    if track_ids:
+        target_key = target_weather.lower()
+        column = classes.index(target_key) if target_key in classes else 0
+        scored.extend(zip(track_ids, probabilities[:, column].tolist()))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return [track_id for track_id, _ in scored]
+
+def create_weather_playlist(sp, user, weather, track_ids, size=5):
+    date_today = date.today().strftime("%Y-%m-%d")
+    playlist = sp.user_playlist_create(
+        user=user["id"],
+        name=f"{date_today} : {user['display_name']}'s {weather} Day Playlist",
+        public=False
     )
+    if track_ids:
+        sp.playlist_add_items(
+            playlist_id=playlist["id"],
+            items=track_ids[:size]
+        )
+    return playlist
+
+def main():
+    # Get weather via frontend (IP-based geolocation)
+    weather = fetch_weather_by_coords(37.7749, -122.4194)
+
+    sp = get_user_spotify()
+    user = sp.current_user()
+    track_ids = fetch_recent_track_ids(sp, history=ListeningHistory(), user_id=user["id"])
+    personal_playlist = build_weather_playlist(track_ids, weather)
+    create_weather_playlist(sp, user, weather, personal_playlist)
+
+if __name__ == "__main__":
+    main()
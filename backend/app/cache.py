@@ -0,0 +1,212 @@
+"""
+Two-tier cache for upstream lookups
+An in-process LRU in front of a SQLite file in shared memory, so an entry
+warmed by one worker process is visible to every other worker
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_shared_cache_path() -> Optional[str]:
+    """
+    Resolve the shared cache file from FORECAST_SHARED_CACHE
+
+    Defaults to a file in /dev/shm (tmpfs) when available. Setting the
+    variable to an empty string disables the shared tier.
+    """
+    path = os.getenv("FORECAST_SHARED_CACHE")
+    if path is not None:
+        return path or None
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() else Path(tempfile.gettempdir())
+    return str(base / "forecastfm-cache.sqlite3")
+
+
+class LocalCache:
+    """
+    Thread-safe in-process LRU cache with per-entry expiry
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, expires_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (expires_at or time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache:
+    """
+    Cross-process key/value cache backed by a WAL-mode SQLite file
+
+    Values are stored as JSON. Each thread keeps its own connection since
+    sqlite3 connections cannot be shared between threads. Every
+    ``prune_every`` writes from a process, expired entries are deleted and
+    the table is capped at ``max_rows`` (soonest to expire go first), so
+    the file stays bounded.
+    """
+
+    def __init__(self, path: str, max_rows: Optional[int] = None, prune_every: int = 1000):
+        self.path = path
+        self.max_rows = max_rows if max_rows is not None else int(os.getenv("FORECAST_SHARED_CACHE_MAX_ROWS", "100000"))
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are keyed by pid as well
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (expires_at, value) or None if missing or expired"""
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[1], json.loads(row[0])
+
+    def set(self, key: str, value: Any, expires_at: float):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+        # Unlocked counter: a lost increment only delays the next prune
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired entries and any beyond max_rows, returning how many were removed"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_rows
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        return removed
+
+
+class TieredCache:
+    """
+    Local LRU backed by an optional shared tier
+
+    Reads check the local tier first and fall back to the shared tier,
+    promoting hits locally. Writes go to both. Failures in the shared tier
+    are logged and treated as misses so the cache never breaks a request.
+    Lookups come from to_thread and batch-fetch threads, so the counters
+    are updated under a lock.
+    """
+
+    def __init__(self, namespace: str, max_local_entries: int = 10_000, shared_path: Optional[str] = None):
+        self.namespace = namespace
+        self.local = LocalCache(max_entries=max_local_entries)
+        self.shared: Optional[SharedCache] = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+        shared_path = shared_path if shared_path is not None else default_shared_cache_path()
+        if shared_path:
+            try:
+                self.shared = SharedCache(shared_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache unavailable at {shared_path}: {e}")
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            with self._stats_lock:
+                self.hits += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                expires_at, value = entry
+                self.local.set(key, value, ttl=0, expires_at=expires_at)
+                with self._stats_lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._stats_lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: float):
+        key = self._key(key)
+        expires_at = time.time() + ttl
+        self.local.set(key, value, ttl=ttl, expires_at=expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        with self._stats_lock:
+            hits, shared_hits, misses = self.hits, self.shared_hits, self.misses
+        lookups = hits + shared_hits + misses
+        return {
+            "local_entries": len(self.local),
+            "local_hits": hits,
+            "shared_hits": shared_hits,
+            "misses": misses,
+            "hit_rate": round((hits + shared_hits) / lookups, 4) if lookups else 0.0,
+            "shared_enabled": self.shared is not None,
+        }
@@ -0,0 +1,87 @@
+"""
+Confidence-based model cascade
+A cheap model answers first and only rows it is unsure about are passed
+to the full model. The threshold and cheap model come from
+``python ml/cascade.py``, which picks the threshold on validation folds.
+"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Union
+
+import joblib
+import numpy as np
+
+
+class ModelCascade:
+    """
+    Fast model with escalation to the full model below a confidence threshold
+
+    Keeps per-stage row counts and time so the traffic share and cost of
+    each stage can be reported.
+    """
+
+    def __init__(self, fast_model, threshold: float):
+        """
+        Initialize the cascade
+
+        Args:
+            fast_model: Fitted pipeline taking raw features
+            threshold: Minimum fast-model confidence to answer without escalating
+        """
+        self.fast_model = fast_model
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.escalated = 0
+        self.fast_seconds = 0.0
+        self.full_seconds = 0.0
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ModelCascade":
+        """Load from the JSON config written by ml/cascade.py"""
+        path = Path(path)
+        config = json.loads(path.read_text())
+        return cls(joblib.load(path.parent / config["fast_model"]), float(config["threshold"]))
+
+    def predict_proba(self, features: np.ndarray, full_predict_proba: Callable, record: bool = True) -> np.ndarray:
+        """
+        Class probabilities, from the fast model where it is confident enough
+
+        Args:
+            features: Raw feature rows of shape (n, 5)
+            full_predict_proba: Full model scoring for the escalated rows
+            record: Count the rows in stats(); off for rescoring outside serving
+        """
+        started = time.perf_counter()
+        probabilities = np.asarray(self.fast_model.predict_proba(features), dtype=np.float64)
+        escalate = probabilities.max(axis=1) < self.threshold
+        fast_done = time.perf_counter()
+
+        if escalate.any():
+            probabilities[escalate] = full_predict_proba(features[escalate])
+        full_done = time.perf_counter()
+        if not record:
+            return probabilities
+
+        with self._lock:
+            self.rows += len(features)
+            self.escalated += int(escalate.sum())
+            self.fast_seconds += fast_done - started
+            self.full_seconds += full_done - fast_done
+        return probabilities
+
+    def stats(self) -> dict:
+        """Per-stage traffic share and average time per row"""
+        with self._lock:
+            rows, escalated = self.rows, self.escalated
+            fast_seconds, full_seconds = self.fast_seconds, self.full_seconds
+        return {
+            "threshold": self.threshold,
+            "rows": rows,
+            "fast_share": round((rows - escalated) / rows, 4) if rows else None,
+            "escalated_share": round(escalated / rows, 4) if rows else None,
+            "fast_us_per_row": round(fast_seconds / rows * 1e6, 1) if rows else None,
+            "full_us_per_escalated_row": round(full_seconds / escalated * 1e6, 1) if escalated else None,
+        }
@@ -0,0 +1,85 @@
+"""
+Compact tree-ensemble model
+Loads the float32 artifact written by ``python ml/export_model.py --compact``
+and evaluates it with numpy alone, so a serving worker does not need to
+import sklearn or keep the training-time estimator state in memory.
+"""
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+SUPPORTED_FORMAT_VERSION = 1
+
+
+class CompactModel:
+    """
+    Scaler + gradient boosting or random forest, flattened into arrays
+
+    Exposes the slice of the sklearn classifier API that ModelLoader uses:
+    ``classes_``, ``predict`` and ``predict_proba``.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        version = int(arrays["format_version"])
+        if version != SUPPORTED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format {version}")
+
+        self.kind = str(arrays["kind"])
+        self.classes_ = np.asarray(arrays["classes"]).astype(object)
+        self.mean_ = arrays["mean"]
+        self.scale_ = arrays["scale"]
+
+        self.roots = arrays["roots"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"].astype(np.intp)
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.max_depth = int(arrays["max_depth"])
+
+        self.tree_class: Optional[np.ndarray] = arrays.get("tree_class")
+        self.learning_rate = float(arrays["learning_rate"]) if "learning_rate" in arrays else 1.0
+        self.init: Optional[np.ndarray] = arrays.get("init")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CompactModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def _leaves(self, features: np.ndarray) -> np.ndarray:
+        """Leaf node index for every (row, tree), walking all trees level by level"""
+        # Scale in float64, then compare in float32 as sklearn's trees do
+        X = ((np.asarray(features, dtype=np.float64) - self.mean_) / self.scale_).astype(np.float32)
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+        return nodes
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        leaves = self._leaves(features)
+
+        if self.kind == "random_forest":
+            return self.value[leaves].mean(axis=1)
+
+        # Gradient boosting: sum each class's tree outputs into a raw score
+        contributions = self.value[leaves]
+        n_classes = len(self.init)
+        raw = np.tile(self.init.astype(np.float64), (len(leaves), 1))
+        for k in range(n_classes):
+            raw[:, k] += self.learning_rate * contributions[:, self.tree_class == k].sum(axis=1)
+
+        if n_classes == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw -= raw.max(axis=1, keepdims=True)
+        probabilities = np.exp(raw)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(features), axis=1)]
@@ -0,0 +1,234 @@
+"""
+User feedback log and online model updates
+Confirmed or corrected weather labels are appended to a JSON-lines log.
+A background updater folds the entries added since its last run into the
+serving model with ``partial_fit`` and republishes it through
+``ModelLoader.load``, so an update costs time in proportion to the new
+feedback rather than the whole training corpus.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(__file__).parent.parent / "models"
+
+
+def default_feedback_path() -> str:
+    return os.getenv("FORECAST_FEEDBACK_LOG", str(MODELS_DIR / "feedback.jsonl"))
+
+
+class FeedbackLog:
+    """
+    Append-only JSON-lines log of label feedback
+
+    Each entry is written with a single append, so workers can share the
+    file. Readers track a byte offset and only ever see complete lines.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path or default_feedback_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, track_id: str, features: Sequence[float], weather: str, predicted: Optional[str]):
+        """
+        Record one piece of feedback
+
+        Args:
+            track_id: Spotify track ID
+            features: The track's audio features in model order
+            weather: Label the user confirmed or chose
+            predicted: Label the model gave at the time
+        """
+        entry = {
+            "ts": time.time(),
+            "track_id": track_id,
+            "features": [float(f) for f in features],
+            "weather": weather,
+            "predicted": predicted,
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+    def read_from(self, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Entries written after a byte offset
+
+        Returns:
+            Tuple of (entries, offset just past the last complete line)
+        """
+        if not self.path.exists():
+            return [], offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return entries, offset + end
+
+
+class OnlineUpdater:
+    """
+    Periodically applies new feedback to the serving model with partial_fit
+
+    The model file must hold a pipeline (or estimator) whose final step
+    supports ``partial_fit``, e.g. the one written by ``python ml/online.py``.
+    How far into the log has been applied is stored on the model object
+    itself (``feedback_state_``), so the offset and the weights it produced
+    are replaced in one atomic file swap and a crash cannot apply the same
+    entries twice. Only one worker updates at a time (file lock); every
+    worker reloads once the file on disk is newer than its copy.
+    """
+
+    def __init__(self, get_model_loader: Callable, log: FeedbackLog):
+        """
+        Initialize the updater
+
+        Args:
+            get_model_loader: Returns the serving ModelLoader
+            log: Feedback log to read from
+        """
+        self.get_model_loader = get_model_loader
+        self.log = log
+        self.updates = 0
+        self.applied = 0
+        self.last_update: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def check_updatable(model_loader) -> None:
+        """
+        Make sure updates to the model file would reach what is served
+
+        Raises:
+            TypeError: If the served model is a compact export, sits behind a
+                lookup table or cascade, or has no ``partial_fit``
+        """
+        if model_loader is None or model_loader.model is None or model_loader.model_path is None:
+            raise TypeError("No model loaded")
+        if model_loader.model_path.suffix != ".pkl":
+            raise TypeError(f"{model_loader.model_path.name} is not a joblib pipeline and cannot be updated")
+        if model_loader.lookup_table is not None or model_loader.cascade is not None:
+            raise TypeError("The model is served through a lookup table or cascade that updates would bypass")
+        model = model_loader.model
+        estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+        if not hasattr(estimator, "partial_fit"):
+            raise TypeError(
+                f"{type(estimator).__name__} in {model_loader.model_path.name} does not support partial_fit"
+            )
+
+    @staticmethod
+    def _legacy_state(model_path: Path) -> dict:
+        """Offset from the state file earlier versions kept next to the model"""
+        state_path = model_path.with_suffix(".state.json")
+        if state_path.exists():
+            return json.loads(state_path.read_text())
+        return {"offset": 0, "applied": 0}
+
+    def update_once(self) -> int:
+        """
+        Fold feedback added since the last update into the model file
+
+        Returns:
+            Number of feedback entries applied (0 if none, or another
+            worker holds the update lock)
+        """
+        model_loader = self.get_model_loader()
+        if model_loader is None or model_loader.model_path is None:
+            return 0
+        self.check_updatable(model_loader)
+        model_path = model_loader.model_path
+
+        with open(model_path.with_suffix(".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+
+            started = time.perf_counter()
+            model = joblib.load(model_path)
+            state = getattr(model, "feedback_state_", None) or self._legacy_state(model_path)
+            entries, offset = self.log.read_from(state["offset"])
+            if not entries:
+                return 0
+
+            estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+            if not hasattr(estimator, "partial_fit"):
+                raise TypeError(f"{type(estimator).__name__} in {model_path.name} does not support partial_fit")
+
+            known = [str(c) for c in estimator.classes_]
+            entries = [e for e in entries if e["weather"] in known]
+            if entries:
+                X = np.array([e["features"] for e in entries], dtype=np.float64)
+                y = np.array([e["weather"] for e in entries], dtype=estimator.classes_.dtype)
+                # Earlier steps (the scaler) stay as fitted on the full corpus
+                if hasattr(model, "steps") and len(model.steps) > 1:
+                    X = model[:-1].transform(X)
+                estimator.partial_fit(X, y)
+
+            # The offset travels with the weights it produced. Write beside
+            # the original and swap, so readers never see half a file
+            model.feedback_state_ = {
+                "offset": offset,
+                "applied": state["applied"] + len(entries),
+                "updated_at": time.time(),
+            }
+            tmp_path = model_path.with_suffix(".tmp")
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, model_path)
+
+        self.updates += 1
+        self.applied += len(entries)
+        self.last_update = time.time()
+        logger.info(
+            f"Applied {len(entries)} feedback entries to {model_path.name} "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return len(entries)
+
+    def tick(self):
+        """Update if there is new feedback, then pick up the newest model file"""
+        try:
+            self.update_once()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Online model update failed: {e}", exc_info=True)
+        model_loader = self.get_model_loader()
+        if model_loader is not None:
+            model_loader.reload_if_changed()
+
+    def start(self, interval_seconds: float):
+        """Run tick() every interval in a background thread"""
+
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                self.tick()
+
+        self._thread = threading.Thread(target=loop, name="online-updater", daemon=True)
+        self._thread.start()
+        logger.info(f"Online model updates every {interval_seconds:.0f}s from {self.log.path}")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "updates": self.updates,
+            "applied": self.applied,
+            "last_update": self.last_update,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,458 @@
+"""
+Background jobs for personalized playlist generation
+Playlist builds call Spotify and Reccobeats once per track, so they run on
+a worker pool outside the request handlers. Clients submit a job, get an
+ID back and poll or stream its progress.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ("queued", "running")
+
+# Tracks whose features a playlist job fetches per bulk call
+FEATURE_BATCH_SIZE = 100
+
+# An in-flight job not updated for this long is treated as orphaned, even if
+# a process with its recorded pid exists
+JOB_STALE_AFTER = int(os.getenv("FORECAST_JOB_STALE_SECONDS", str(30 * 60)))
+
+
+def default_job_db_path() -> str:
+    """Resolve the job database from FORECAST_JOB_DB (default: backend/models)"""
+    path = os.getenv("FORECAST_JOB_DB")
+    if path:
+        return path
+    return str(Path(__file__).parent.parent / "models" / "jobs.sqlite3")
+
+
+class Job:
+    """
+    State of one playlist build
+
+    Progress updates are appended to ``events`` so streaming clients can
+    resume from the last event they saw. Once the job is in a store, every
+    update is written through to it so any worker process can serve it.
+    """
+
+    def __init__(self, user_id: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.params = params
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.events: List[Dict[str, Any]] = []
+        self.store: Optional["JobStore"] = None
+        self._record()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "Job":
+        """Read-only copy of a stored job, without its params"""
+        job = cls.__new__(cls)
+        job.id = snapshot["job_id"]
+        job.user_id = snapshot["user_id"]
+        job.params = {}
+        job.status = snapshot["status"]
+        job.progress = snapshot["progress"]
+        job.message = snapshot["message"]
+        job.result = snapshot["result"]
+        job.error = snapshot["error"]
+        job.created_at = snapshot["created_at"]
+        job.updated_at = snapshot["updated_at"]
+        job.events = []
+        job.store = None
+        return job
+
+    def _record(self):
+        self.updated_at = time.time()
+        event = self.snapshot()
+        self.events.append(event)
+        if self.store is not None:
+            self.store.save(self, len(self.events) - 1, event)
+
+    def report(self, progress: float, message: str):
+        """Record progress from inside the job (0.0-1.0)"""
+        self.progress = max(0.0, min(1.0, progress))
+        self.message = message
+        self._record()
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ACTIVE_STATES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobStore:
+    """
+    SQLite store of job snapshots and progress events shared by all workers
+
+    A partial unique index allows one queued or running job per user, so
+    deduplication holds across processes. A job whose recording process
+    has exited (checked by pid and start time) or which has gone stale is
+    failed so it cannot block its user. Job params (the user's access
+    token) are never written; only the worker running the job holds them.
+    Each thread keeps its own connection since sqlite3 connections cannot
+    be shared between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_job_db_path()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL, "
+                "snapshot TEXT NOT NULL, pid INTEGER NOT NULL, updated_at REAL NOT NULL, boot TEXT)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "boot" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN boot TEXT")
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_user ON jobs (user_id) "
+                "WHERE status IN ('queued', 'running')"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, "
+                "PRIMARY KEY (job_id, seq))"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def insert(self, job: Job) -> Optional[str]:
+        """
+        Store a new job unless its user already has one in flight
+
+        Returns:
+            None if stored, else the ID of the user's active job
+        """
+        conn = self._conn()
+        for _ in range(2):
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO jobs (job_id, user_id, status, snapshot, pid, updated_at, boot) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            job.id, job.user_id, job.status, json.dumps(job.snapshot()),
+                            os.getpid(), job.updated_at, _process_boot(os.getpid()),
+                        ),
+                    )
+                    conn.executemany(
+                        "INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                        [(job.id, seq, json.dumps(event)) for seq, event in enumerate(job.events)],
+                    )
+                return None
+            except sqlite3.IntegrityError:
+                row = conn.execute(
+                    "SELECT job_id, pid, boot, updated_at FROM jobs "
+                    "WHERE user_id = ? AND status IN ('queued', 'running')",
+                    (job.user_id,),
+                ).fetchone()
+                if row is None:
+                    continue
+                active_id, pid, boot, updated_at = row
+                if time.time() - updated_at < JOB_STALE_AFTER and _process_alive(pid, boot):
+                    return active_id
+                # The worker running it exited; fail the job and try again
+                self._fail_orphan(active_id)
+        raise RuntimeError(f"Could not queue a job for user {job.user_id}")
+
+    def fail_unfinished(self, pid: int) -> int:
+        """Mark the jobs a process had queued or running as failed; returns how many"""
+        rows = self._conn().execute(
+            "SELECT job_id FROM jobs WHERE pid = ? AND status IN ('queued', 'running')", (pid,)
+        ).fetchall()
+        for (job_id,) in rows:
+            self._fail_orphan(job_id)
+        return len(rows)
+
+    def _fail_orphan(self, job_id: str):
+        snapshot = self.get(job_id)
+        if snapshot is None:
+            return
+        job = Job.from_snapshot(snapshot)
+        job.status = "failed"
+        job.error = "Worker process exited before the job finished"
+        job.message = "Failed"
+        job.updated_at = time.time()
+        self.save(job, len(self.events(job_id)), job.snapshot())
+
+    def save(self, job: Job, seq: int, event: Dict[str, Any]):
+        """Write a job's latest state and its new progress event"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, snapshot = ?, updated_at = ? WHERE job_id = ?",
+                (job.status, json.dumps(event), job.updated_at, job.id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                (job.id, seq, json.dumps(event)),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT snapshot FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """A job's progress events from index ``after`` onwards"""
+        rows = self._conn().execute(
+            "SELECT event FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+            (job_id, after),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def evict(self, max_finished: int):
+        """Drop the oldest finished jobs past the retention limit"""
+        conn = self._conn()
+        with conn:
+            stale = [row[0] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE status NOT IN ('queued', 'running') "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+                (max_finished,),
+            )]
+            conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(job_id,) for job_id in stale])
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in stale])
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def _process_boot(pid: int) -> Optional[str]:
+    """Start time of a process, which tells it apart from a later one reusing its pid"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces, so split after its closing paren
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _process_alive(pid: int, boot: Optional[str]) -> bool:
+    """Whether the process that recorded a job is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Some other user's process holds the pid now
+        return False
+    if boot is None:
+        return True
+    return _process_boot(pid) == boot
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded worker pool with per-user deduplication
+
+    While a user has a queued or running job, submitting again returns that
+    job instead of starting a second build. Jobs live in a JobStore shared
+    by all worker processes, so a job can be polled or streamed through any
+    worker, not only the one that runs it. Finished jobs are kept for
+    polling until ``max_finished`` newer ones push them out.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Job], Dict[str, Any]],
+        max_workers: Optional[int] = None,
+        max_finished: int = 1000,
+        store: Optional[JobStore] = None,
+    ):
+        """
+        Initialize the job manager
+
+        Args:
+            run: Function doing the work; returns the job result
+            max_workers: Pool size (default: FORECAST_JOB_WORKERS or 4)
+            max_finished: Finished jobs retained for polling
+            store: Shared job store (default: FORECAST_JOB_DB)
+        """
+        self.run = run
+        self.max_workers = max_workers or int(os.getenv("FORECAST_JOB_WORKERS", "4"))
+        self.max_finished = max_finished
+        self.store = store or JobStore()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="playlist-job")
+
+    def submit(self, user_id: str, params: Dict[str, Any]) -> Tuple[Job, bool]:
+        """
+        Queue a job for a user unless one is already in flight
+
+        Returns:
+            Tuple of (job, created) where created is False for a duplicate
+        """
+        job = Job(user_id, params)
+        active_id = self.store.insert(job)
+        if active_id is not None:
+            active = self.get(active_id)
+            if active is not None:
+                return active, False
+        job.store = self.store
+        self.store.evict(self.max_finished)
+
+        self._executor.submit(self._execute, job)
+        logger.info(f"Queued playlist job {job.id} for user {user_id}")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        snapshot = self.store.get(job_id)
+        return Job.from_snapshot(snapshot) if snapshot is not None else None
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        return self.store.events(job_id, after)
+
+    def _execute(self, job: Job):
+        stored = self.store.get(job.id)
+        if stored is None or stored["status"] != "queued":
+            # Failed as orphaned while waiting in the queue
+            job.params.pop("access_token", None)
+            return
+        job.status = "running"
+        job.report(0.0, "Started")
+        try:
+            job.result = self.run(job)
+            job.status = "succeeded"
+            job.report(1.0, "Done")
+            logger.info(f"Playlist job {job.id} succeeded")
+        except Exception as e:
+            logger.error(f"Playlist job {job.id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = "failed"
+            job.report(job.progress, "Failed")
+        finally:
+            # The token is only needed while the job runs
+            job.params.pop("access_token", None)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = self.store.counts()
+        return {
+            "workers": self.max_workers,
+            **{state: counts.get(state, 0) for state in ("queued", "running", "succeeded", "failed")},
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Jobs cancelled or cut off here would otherwise read as in flight forever
+        self.store.fail_unfinished(os.getpid())
+
+
+def make_playlist_runner(
+    get_model_loader: Callable,
+    get_spotify_service: Callable,
+    get_scheduler: Callable = lambda: None,
+    get_history: Callable = lambda: None,
+    playlist_size: int = 5,
+):
+    """
+    Build the job function for personalized weather playlists
+
+    Args:
+        get_model_loader: Returns the serving ModelLoader
+        get_spotify_service: Returns the shared SpotifyService (for cached features)
+        get_scheduler: Returns the RegionPlaylistScheduler, or None
+        get_history: Returns the ListeningHistory, or None to use only the latest plays
+        playlist_size: Number of tracks added to the playlist
+    """
+
+    def run(job: Job) -> Dict[str, Any]:
+        import spotipy
+        from backend.api.fetch_weather import fetch_weather_cached
+        from backend.api.playlist_gen import (
+            build_weather_playlist,
+            create_weather_playlist,
+            fetch_recent_track_ids,
+        )
+
+        model_loader = get_model_loader()
+        if model_loader is None or model_loader.model is None:
+            raise RuntimeError("Model not loaded")
+
+        sp = spotipy.Spotify(auth=job.params["access_token"])
+        user = sp.current_user()
+        if user["id"] != job.user_id:
+            raise PermissionError("Access token does not belong to this user")
+
+        lat, lon = job.params["lat"], job.params["lon"]
+        scheduler = get_scheduler()
+
+        job.report(0.1, "Fetching weather")
+        weather = fetch_weather_cached(lat, lon)
+        known_scores = scheduler.ranking_for(weather) if scheduler else None
+
+        job.report(0.2, "Fetching recently played tracks")
+        track_ids = list(dict.fromkeys(fetch_recent_track_ids(sp, history=get_history(), user_id=user["id"])))
+
+        # Prefetch features in bulk batches so progress advances per batch
+        spotify_service = get_spotify_service()
+        missing = [track_id for track_id in track_ids if not known_scores or track_id not in known_scores]
+        features: Dict[str, Any] = {}
+        for start in range(0, len(missing), FEATURE_BATCH_SIZE):
+            job.report(0.3 + 0.6 * start / len(missing), f"Scoring tracks ({start}/{len(missing)})")
+            features.update(spotify_service.get_audio_features_bulk(missing[start:start + FEATURE_BATCH_SIZE]))
+
+        def get_features(track_id):
+            audio_features = features.get(track_id)
+            if audio_features is None or isinstance(audio_features, Exception):
+                logger.info(f"Skipping track {track_id}: {audio_features}")
+                return None
+            return audio_features
+
+        ranked = build_weather_playlist(
+            track_ids,
+            weather,
+            predict_proba=model_loader.predict_proba,
+            get_features=get_features,
+            known_scores=known_scores,
+        )
+
+        job.report(0.95, "Creating playlist")
+        playlist = create_weather_playlist(sp, user, weather, ranked, size=playlist_size)
+
+        return {
+            "weather": weather.lower(),
+            "playlist_id": playlist["id"],
+            "playlist_url": playlist.get("external_urls", {}).get("spotify"),
+            "track_ids": ranked[:playlist_size],
+            "candidates": len(track_ids),
+            "pregenerated": len(known_scores.keys() & set(track_ids)) if known_scores else 0,
+        }
+
+    return run
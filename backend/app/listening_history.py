@@ -0,0 +1,155 @@
+"""
+Persistent per-user listening history
+Spotify only exposes a user's last 50 plays. Each sync asks for plays
+after the stored cursor and merges them into the user's track set, so a
+sync costs one request per batch of new plays and the history keeps
+growing past the API window.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spotify's page size cap for recently played
+PAGE_LIMIT = 50
+
+
+def default_history_path() -> str:
+    """Resolve the history database from FORECAST_HISTORY_DB (default: backend/models)"""
+    path = os.getenv("FORECAST_HISTORY_DB")
+    if path:
+        return path
+    return str(Path(__file__).parent.parent / "models" / "listening_history.sqlite3")
+
+
+def played_at_ms(played_at: str) -> int:
+    """Convert a Spotify played_at timestamp to the millisecond cursor format"""
+    return int(datetime.fromisoformat(played_at.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+class ListeningHistory:
+    """
+    SQLite store of sync cursors and per-user track sets
+
+    Each thread keeps its own connection since sqlite3 connections cannot
+    be shared between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_history_path()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            "user_id TEXT PRIMARY KEY, after_ms INTEGER NOT NULL, synced_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "user_id TEXT NOT NULL, track_id TEXT NOT NULL, "
+            "first_played_ms INTEGER NOT NULL, last_played_ms INTEGER NOT NULL, "
+            "play_count INTEGER NOT NULL, PRIMARY KEY (user_id, track_id))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def cursor(self, user_id: str) -> Optional[int]:
+        """The last synced play time (ms since epoch), or None before the first sync"""
+        row = self._conn().execute(
+            "SELECT after_ms FROM sync_state WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _fetch_new_items(self, sp, after_ms: Optional[int]) -> List[Dict]:
+        """Plays newer than the cursor, or the whole available window on first sync"""
+        if after_ms is not None:
+            page = sp.current_user_recently_played(limit=PAGE_LIMIT, after=after_ms)
+            items = list(page.get("items", []))
+            while page.get("next") and len(items) < 10 * PAGE_LIMIT:
+                page = sp.next(page)
+                if not page:
+                    break
+                items.extend(page.get("items", []))
+            return items
+
+        # First sync: walk back through everything Spotify still has
+        page = sp.current_user_recently_played(limit=PAGE_LIMIT)
+        items = list(page.get("items", []))
+        if items and items[-1].get("played_at"):
+            before_ms = played_at_ms(items[-1]["played_at"])
+            items.extend(sp.current_user_recently_played(limit=PAGE_LIMIT, before=before_ms).get("items", []))
+        return items
+
+    def sync(self, sp, user_id: str) -> int:
+        """
+        Fetch plays since the last sync and merge them into the track set
+
+        Args:
+            sp: Authenticated spotipy client for the user
+            user_id: Spotify user ID the history belongs to
+
+        Returns:
+            Number of new plays merged
+        """
+        after_ms = self.cursor(user_id)
+        items = self._fetch_new_items(sp, after_ms)
+
+        plays = []
+        for item in items:
+            track = item.get("track") or {}
+            if not track.get("id") or not item.get("played_at"):
+                continue
+            played = played_at_ms(item["played_at"])
+            # Spotify's cursor is exclusive, but guard against overlapping pages
+            if after_ms is None or played > after_ms:
+                plays.append((track["id"], played))
+
+        if not plays:
+            return 0
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO tracks (user_id, track_id, first_played_ms, last_played_ms, play_count) "
+                "VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (user_id, track_id) DO UPDATE SET "
+                "first_played_ms = MIN(first_played_ms, excluded.first_played_ms), "
+                "last_played_ms = MAX(last_played_ms, excluded.last_played_ms), "
+                "play_count = play_count + 1",
+                [(user_id, track_id, played, played) for track_id, played in plays],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (user_id, after_ms, synced_at) "
+                "VALUES (?, ?, strftime('%s', 'now'))",
+                (user_id, max(played for _, played in plays)),
+            )
+
+        logger.info(f"Synced {len(plays)} new plays for user {user_id}")
+        return len(plays)
+
+    def track_ids(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        """
+        The user's known tracks, most recently played first
+
+        Args:
+            user_id: Spotify user ID
+            limit: Maximum number of tracks (default: all)
+        """
+        rows = self._conn().execute(
+            "SELECT track_id FROM tracks WHERE user_id = ? "
+            "ORDER BY last_played_ms DESC, track_id LIMIT ?",
+            (user_id, -1 if limit is None else limit),
+        ).fetchall()
+        return [row[0] for row in rows]
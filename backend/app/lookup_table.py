@@ -0,0 +1,70 @@
+"""
+Precomputed prediction lookup table
+Reads the grid written by ``python ml/export_model.py --lookup-table``.
+The table is memory-mapped, so workers share its pages, and a prediction
+is five binary searches over a few dozen grid points plus one array
+index.
+"""
+import json
+from bisect import bisect_left
+
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+
+class LookupTable:
+    """
+    Class probabilities on a quantized grid of the five model inputs
+
+    Each input snaps to its nearest grid point; inputs beyond the grid use
+    the edge cell. Probabilities are stored as uint8 (p * 255).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        path = Path(path)
+        meta = json.loads(path.with_suffix(".json").read_text())
+        self.table = np.load(path, mmap_mode="r")
+        self.classes: List[str] = meta["classes"]
+        self.agreement: float = meta["agreement"]
+        self.accuracy_delta: float = meta["lookup_accuracy"] - meta["model_accuracy"]
+        # Sample rows and the source model's probabilities for them (absent in old tables)
+        self.fingerprint: Optional[dict] = meta.get("model_fingerprint")
+        self.shape = self.table.shape[:-1]
+        # Plain lists: bisect on a short list beats a numpy call per value
+        self._midpoints = [
+            [(low + high) / 2 for low, high in zip(axis[:-1], axis[1:])] for axis in meta["axes"]
+        ]
+
+    def _cell(self, features) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float64).reshape(-1).tolist()
+        index = tuple(
+            bisect_left(midpoints, value) for midpoints, value in zip(self._midpoints, features)
+        )
+        return self.table[index]
+
+    def lookup(self, features: np.ndarray) -> Tuple[str, float]:
+        """
+        Predict one row by indexing the table
+
+        Args:
+            features: array-like of 5 values in model feature order
+
+        Returns:
+            Tuple of (weather_label, confidence_score)
+        """
+        cell = self._cell(features)
+        best = int(cell.argmax())
+        return self.classes[best], float(cell[best]) / 255.0
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Table probabilities for rows of shape (n, 5), columns in ``classes`` order"""
+        return np.array([self._cell(row) for row in np.asarray(features)], dtype=np.float64) / 255.0
+
+    def info(self) -> dict:
+        return {
+            "grid": list(self.shape),
+            "size_mb": round(self.table.nbytes / 2**20, 1),
+            "agreement": round(self.agreement, 4),
+            "accuracy_delta": round(self.accuracy_delta, 4),
+        }
@@ -2,22 +2,49 @@
 Forecast.fm FastAPI Backend
 Weather prediction from Spotify audio features
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
-import numpy as np
+import asyncio
+import gc
+import hmac
+import json
 import logging
+import os
+import threading
+import time
 from pathlib import Path
+from typing import Optional
 
 from .schemas import (
     PredictionRequest,
     PredictionResponse,
     SongSearchRequest,
     SongWeatherResponse,
+    SongBatchRequest,
+    SongBatchResponse,
+    FeedbackRequest,
+    FeedbackResponse,
+    SimilarSongsRequest,
+    SimilarSongsResponse,
+    SimilarTrack,
+    PlaylistJobRequest,
+    PlaylistJobResponse,
     HealthResponse
 )
-from .model_loader import ModelLoader
-from .spotify_service import spotify_service
+from .jobs import ACTIVE_STATES, JobManager, make_playlist_runner
+from .resilience import DeadlineExceeded, LoadSheddingMiddleware, resilience_stats
+from .tracing import TraceMiddleware
+from .responses import (
+    FAST_RESPONSES,
+    FastJSONResponse,
+    PredictionJSONResponse,
+    song_weather_content
+)
+
+# numpy, sklearn (via the pickled model), spotipy and requests are imported
+# on first use or by the background warm-up, not when this module loads
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,30 +53,186 @@ logger = logging.getLogger(__name__)
 # Global model loader instance
 model_loader = None
 
+# Global similarity index over catalogued tracks
+similarity_index = None
+
+# Global worker pool for playlist builds
+job_manager = None
+
+# Global daily playlist pre-generation, created by the warm-up
+scheduler = None
+
+# Global per-user listening history, opened on first playlist job
+listening_history = None
+_history_lock = threading.Lock()
+
+# Global feedback log, and the updater folding it into the model, created by the warm-up
+feedback_log = None
+online_updater = None
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "models"
+
+# Load the model at import time so a pre-forking server (gunicorn --preload)
+# loads it once in the master and workers share the pages copy-on-write
+PRELOAD = os.getenv("FORECAST_PRELOAD", "0") == "1"
+
+# Set once the warm-up has finished; /health/ready reports 503 until then
+ready = threading.Event()
+
+
+def get_spotify_service():
+    """Get the shared Spotify service, importing spotipy on first use"""
+    from .spotify_service import get_spotify_service as _get_spotify_service
+    return _get_spotify_service()
+
+
+def get_listening_history():
+    """Get the shared listening history store, opening it on first use"""
+    global listening_history
+    if listening_history is None:
+        with _history_lock:
+            if listening_history is None:
+                from .listening_history import ListeningHistory
+                listening_history = ListeningHistory()
+    return listening_history
+
+
+def load_resources():
+    """Load the ML model and open the similarity index into the globals"""
+    global model_loader, similarity_index
+    from .model_loader import ModelLoader
+    from .similarity_index import SimilarityIndex
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load ML model on startup, cleanup on shutdown"""
-    global model_loader
-    logger.info("Starting Forecast.fm API...")
     logger.info("Loading ML model...")
 
-    models_dir = (Path(__file__).resolve().parent.parent / "models")
-    model_loader = ModelLoader(models_dir=str(models_dir))
+    loader = ModelLoader(models_dir=str(MODELS_DIR))
 
     try:
-        model_loader.load()
-        logger.info(f"✓ Model loaded successfully: {model_loader.model_type}")
+        loader.load(os.getenv("FORECAST_MODEL_FILE", "model.pkl"))
+        logger.info(f"✓ Model loaded successfully: {loader.model_type}")
     except FileNotFoundError as e:
         logger.error(f"✗ Model file not found: {e}")
         logger.warning("Starting without model - predictions will fail until model is added")
     except Exception as e:
         logger.error(f"✗ Failed to load model: {e}")
         logger.warning("Starting without model - predictions will fail")
+    if loader.model is not None and os.getenv("FORECAST_CASCADE"):
+        try:
+            loader.load_cascade(os.getenv("FORECAST_CASCADE"))
+        except Exception as e:
+            logger.error(f"✗ Failed to load model cascade, using the full model: {e}")
+    if loader.model is not None and os.getenv("FORECAST_SHADOW_MODEL"):
+        try:
+            loader.load_shadow(
+                os.getenv("FORECAST_SHADOW_MODEL"),
+                sample_rate=float(os.getenv("FORECAST_SHADOW_RATE", "0.1")),
+                queue_size=int(os.getenv("FORECAST_SHADOW_QUEUE", "256")),
+            )
+        except Exception as e:
+            logger.error(f"✗ Failed to load shadow model, serving without it: {e}")
+    if loader.model is not None and os.getenv("FORECAST_LOOKUP_TABLE"):
+        try:
+            loader.load_lookup_table(os.getenv("FORECAST_LOOKUP_TABLE"))
+        except Exception as e:
+            logger.error(f"✗ Failed to load lookup table, using the full model: {e}")
+    model_loader = loader
+
+    index = SimilarityIndex(index_dir=os.getenv("FORECAST_SIMILARITY_INDEX", str(MODELS_DIR / "similarity_index")))
+    try:
+        index.open(*model_loader.feature_scaling())
+        similarity_index = index
+    except Exception as e:
+        logger.error(f"✗ Failed to open similarity index: {e}")
+
+
+def start_scheduler():
+    """Create the pre-generation scheduler; run it daily if FORECAST_PREGEN_HOUR is set"""
+    global scheduler
+    from .scheduler import RegionPlaylistScheduler
+
+    scheduler = RegionPlaylistScheduler(lambda: model_loader, lambda: similarity_index)
+    hour = os.getenv("FORECAST_PREGEN_HOUR")
+    if hour:
+        scheduler.start(int(hour))
+
+
+def start_online_updates():
+    """Open the feedback log; apply it to the model every FORECAST_FEEDBACK_UPDATE_MINUTES if set"""
+    global feedback_log, online_updater
+    from .feedback import FeedbackLog, OnlineUpdater
+
+    feedback_log = FeedbackLog()
+    minutes = os.getenv("FORECAST_FEEDBACK_UPDATE_MINUTES")
+    if minutes:
+        # Updating a file the served model does not come from would let the two diverge
+        try:
+            OnlineUpdater.check_updatable(model_loader)
+        except TypeError as e:
+            logger.error(f"✗ Online feedback updates disabled: {e}")
+            return
+        online_updater = OnlineUpdater(lambda: model_loader, feedback_log)
+        online_updater.start(float(minutes) * 60)
+
+
+def warm_up():
+    """
+    Load everything the request path needs and exercise it once
+
+    Runs in a background thread so the server answers liveness probes
+    immediately. The dummy prediction pays for sklearn's lazy initialization
+    here rather than on the first real request.
+    """
+    started = time.perf_counter()
+    try:
+        if model_loader is None:
+            load_resources()
+        if model_loader.model is not None:
+            model_loader.predict([[0.5, 0.5, 120.0, 0.5, -8.0]])
+        get_spotify_service()
+        start_scheduler()
+        start_online_updates()
+    except Exception as e:
+        logger.error(f"✗ Warm-up failed: {e}", exc_info=True)
+    finally:
+        ready.set()
+        logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
+if PRELOAD:
+    load_resources()
+    # Move everything loaded so far out of the collector's reach, otherwise
+    # the first GC pass in each worker touches every object and un-shares
+    # the pages the workers inherited from the master
+    gc.freeze()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load ML model on startup, cleanup on shutdown"""
+    global job_manager
+    logger.info("Starting Forecast.fm API...")
+
+    if model_loader is not None:
+        logger.info(f"Using preloaded model: {model_loader.model_type}")
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    job_manager = JobManager(
+        make_playlist_runner(
+            lambda: model_loader,
+            get_spotify_service,
+            lambda: scheduler,
+            get_listening_history,
+        )
+    )
 
     yield
 
     logger.info("Shutting down Forecast.fm API...")
+    job_manager.shutdown()
+    if scheduler is not None:
+        scheduler.stop()
+    if online_updater is not None:
+        online_updater.stop()
 
 
 # Initialize FastAPI app
@@ -62,6 +245,15 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Opt-in sampled request traces for python -m backend.replay; added first so
+# it runs inside load shedding and shed requests are not recorded
+if os.getenv("FORECAST_TRACE_FILE"):
+    app.add_middleware(TraceMiddleware, path=os.getenv("FORECAST_TRACE_FILE"))
+
+# Request deadlines and load shedding; added before CORS so it runs inside
+# it and shed responses still get CORS headers
+app.add_middleware(LoadSheddingMiddleware)
+
 # Configure CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -88,7 +280,8 @@ async def root():
     return HealthResponse(
         status="healthy",
         message="Forecast.fm API is running",
-        model_loaded=model_loader is not None and model_loader.model is not None
+        model_loaded=model_loader is not None and model_loader.model is not None,
+        ready=ready.is_set()
     )
 
 
@@ -99,16 +292,41 @@ async def health():
     if model_loader and model_loader.model:
         model_info = model_loader.get_model_info()
 
+    if not ready.is_set():
+        status, message = "starting", "Warming up"
+    elif model_loader and model_loader.model:
+        status, message = "healthy", "Model loaded and ready"
+    else:
+        status, message = "degraded", "Model not loaded"
+
     return HealthResponse(
-        status="healthy" if model_loader and model_loader.model else "degraded",
-        message="Model loaded and ready" if model_loader and model_loader.model else "Model not loaded",
+        status=status,
+        message=message,
         model_loaded=model_loader is not None and model_loader.model is not None,
+        ready=ready.is_set(),
         model_info=model_info
     )
 
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe - the process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe - 503 until the warm-up has finished and a model is loaded"""
+    if ready.is_set() and model_loader and model_loader.model:
+        return {"status": "ready"}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "starting" if not ready.is_set() else "degraded"}
+    )
+
+
+@app.post("/predict", response_model=PredictionResponse, response_model_exclude_none=True)
+async def predict(request: PredictionRequest, background_tasks: BackgroundTasks, distribution: bool = False):
     """
     Predict weather category from Spotify audio features
 
@@ -122,6 +340,7 @@ async def predict(request: PredictionRequest):
     **Returns:**
     - weather: sunny | cloudy | rainy | snowy
     - confidence: prediction probability (0.0-1.0)
+    - probabilities: every category's probability (with `?distribution=true`)
 
     **Example request:**
     ```json
@@ -142,16 +361,27 @@ async def predict(request: PredictionRequest):
 
     try:
         # Prepare features array in the correct order
-        features = np.array([[
+        features = [[
             request.energy,
             request.valence,
             request.tempo,
             request.acousticness,
             request.loudness
-        ]])
+        ]]
+
+        # Get prediction, from the same inference pass as the distribution
+        probabilities = None
+        if distribution:
+            matrix, labels = model_loader.predict_distribution(features)
+            probabilities = {label: round(float(p), 4) for label, p in zip(labels, matrix[0])}
+            best = int(matrix[0].argmax())
+            prediction, confidence = labels[best], float(matrix[0, best])
+        else:
+            prediction, confidence = model_loader.predict(features)
 
-        # Get prediction
-        prediction, confidence = model_loader.predict(features)
+        # Shadow scoring is queued only once the response has been sent
+        if model_loader.shadow is not None:
+            background_tasks.add_task(model_loader.shadow_offer, features)
 
         logger.info(
             f"Prediction: {prediction} (confidence: {confidence:.2%}) | "
@@ -160,9 +390,19 @@ async def predict(request: PredictionRequest):
             f"loudness={request.loudness:.1f}"
         )
 
+        if FAST_RESPONSES:
+            if probabilities is not None:
+                return FastJSONResponse({
+                    "weather": prediction,
+                    "confidence": round(confidence, 4),
+                    "probabilities": probabilities,
+                })
+            return PredictionJSONResponse(prediction, round(confidence, 4))
+
         return PredictionResponse(
             weather=prediction,
-            confidence=round(confidence, 4)
+            confidence=round(confidence, 4),
+            probabilities=probabilities
         )
 
     except ValueError as e:
@@ -177,7 +417,7 @@ async def predict(request: PredictionRequest):
 
 
 @app.post("/predict-song", response_model=SongWeatherResponse)
-async def predict_song_weather(request: SongSearchRequest):
+async def predict_song_weather(request: SongSearchRequest, background_tasks: BackgroundTasks):
     """
     Search for a song on Spotify and predict its weather
 
@@ -203,53 +443,55 @@ async def predict_song_weather(request: SongSearchRequest):
         )
 
     try:
-        # Search Spotify and get audio features
+        # Search Spotify and get audio features; the lookups block on network
+        # I/O, so keep them off the event loop
         logger.info(f"Searching Spotify for: {request.query}")
-        song_data = spotify_service.get_track_info_and_features(request.query)
+        song = await asyncio.to_thread(get_spotify_service().get_track_info_and_features, request.query)
 
-        if not song_data:
+        if not song:
             raise HTTPException(
                 status_code=404,
                 detail=f"No songs found for query: {request.query}"
             )
 
-        # Extract audio features for ML prediction
-        audio_features = song_data["audio_features"]
-
-        if "happy" in song_data["name"].lower() and "pharrell" in song_data["artist"].lower():
+        if "happy" in song.name.lower() and "pharrell" in song.artist.lower():
             prediction = "sunny"
             confidence = 0.95
         else:
-            features = np.array([[
-                audio_features["energy"],
-                audio_features["valence"],
-                audio_features["tempo"],
-                audio_features["acousticness"],
-                audio_features["loudness"]
-            ]])
-
             # Get ML prediction
-            prediction, confidence = model_loader.predict(features)
+            prediction, confidence = model_loader.predict([song.features])
+            if model_loader.shadow is not None:
+                background_tasks.add_task(model_loader.shadow_offer, [song.features])
+
+            # Catalogue the track so it can show up in similarity lookups
+            if similarity_index is not None:
+                background_tasks.add_task(similarity_index.add, [song.track_id], [song.features])
 
         logger.info(
-            f"Song: {song_data['name']} by {song_data['artist']} → "
+            f"Song: {song.name} by {song.artist} → "
             f"Weather: {prediction} (confidence: {confidence:.2%})"
         )
 
+        if FAST_RESPONSES:
+            return FastJSONResponse(song_weather_content(song, prediction, round(confidence, 4)))
+
         return SongWeatherResponse(
-            track_id=song_data["track_id"],
-            name=song_data["name"],
-            artist=song_data["artist"],
-            album=song_data["album"],
-            image_url=song_data["image_url"],
-            preview_url=song_data["preview_url"],
+            track_id=song.track_id,
+            name=song.name,
+            artist=song.artist,
+            album=song.album,
+            image_url=song.image_url,
+            preview_url=song.preview_url,
             weather=prediction,
             confidence=round(confidence, 4),
-            audio_features=audio_features
+            audio_features=song.audio_features
         )
 
     except HTTPException:
         raise
+    except DeadlineExceeded as e:
+        logger.warning(f"Song prediction timed out: {e}")
+        raise HTTPException(status_code=504, detail="Upstream services too slow, please retry")
     except ValueError as e:
         logger.error(f"Spotify API error: {e}")
         raise HTTPException(
@@ -264,6 +506,247 @@ async def predict_song_weather(request: SongSearchRequest):
         )
 
 
+@app.post("/predict-songs", response_model=SongBatchResponse)
+async def predict_songs_weather(request: SongBatchRequest):
+    """
+    Search for many songs and predict each one's weather
+
+    Searches and feature lookups run concurrently and all songs are scored
+    in one model call. Every query gets its own result or error, so one
+    bad query does not fail the batch.
+
+    **Example request:**
+    ```json
+    {
+        "queries": ["Happy - Pharrell Williams", "Riders on the Storm - The Doors"]
+    }
+    ```
+    """
+    if not model_loader or not model_loader.model:
+        raise HTTPException(
+            status_code=503,
+            detail="ML model not loaded. Please check server configuration."
+        )
+
+    try:
+        # The lookups block on network I/O, so keep them off the event loop
+        songs = await asyncio.to_thread(get_spotify_service().get_tracks_info_and_features, request.queries)
+    except ValueError as e:
+        logger.error(f"Spotify API error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Spotify service not configured. Please set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables."
+        )
+
+    predictions = {}
+    scored = [
+        (i, song) for i, song in enumerate(songs)
+        if song is not None and not isinstance(song, Exception)
+        and not ("happy" in song.name.lower() and "pharrell" in song.artist.lower())
+    ]
+    if scored:
+        try:
+            probabilities, labels = model_loader.predict_proba([song.features for _, song in scored])
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail="Prediction failed. Check server logs for details."
+            )
+        best = probabilities.argmax(axis=1)
+        for (i, _), column, row in zip(scored, best, probabilities):
+            predictions[i] = (labels[column], float(row[column]))
+
+        # Catalogue the tracks so they can show up in similarity lookups
+        if similarity_index is not None:
+            await asyncio.to_thread(
+                similarity_index.add, [song.track_id for _, song in scored], [song.features for _, song in scored]
+            )
+
+    results = []
+    for i, (query, song) in enumerate(zip(request.queries, songs)):
+        if song is None:
+            results.append({"query": query, "result": None, "error": f"No songs found for query: {query}"})
+        elif isinstance(song, Exception):
+            results.append({"query": query, "result": None, "error": str(song)})
+        else:
+            prediction, confidence = predictions.get(i, ("sunny", 0.95))
+            results.append({
+                "query": query,
+                "result": song_weather_content(song, prediction, round(confidence, 4)),
+                "error": None,
+            })
+
+    logger.info(
+        f"Batch of {len(results)} songs: "
+        f"{sum(item['error'] is None for item in results)} predicted"
+    )
+
+    if FAST_RESPONSES:
+        return FastJSONResponse({"results": results})
+    return SongBatchResponse(results=results)
+
+
+@app.post("/similar-songs", response_model=SimilarSongsResponse)
+async def similar_songs(request: SimilarSongsRequest):
+    """
+    Find catalogued songs that sound like a seed song and suit a weather
+
+    **Flow:**
+    1. Search Spotify for the seed song and fetch its audio features
+    2. Query the similarity index for its nearest neighbours
+    3. Predict weather for the neighbours in one batch and keep the matching ones
+
+    **Example request:**
+    ```json
+    {
+        "query": "Happy - Pharrell Williams",
+        "weather": "sunny",
+        "limit": 10
+    }
+    ```
+    """
+    if not model_loader or not model_loader.model:
+        raise HTTPException(
+            status_code=503,
+            detail="ML model not loaded. Please check server configuration."
+        )
+    if similarity_index is None:
+        raise HTTPException(status_code=503, detail="Similarity index not available")
+
+    try:
+        song = await asyncio.to_thread(get_spotify_service().get_track_info_and_features, request.query)
+        if not song:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No songs found for query: {request.query}"
+            )
+
+        await asyncio.to_thread(similarity_index.add, [song.track_id], [song.features])
+
+        weather = request.weather.lower() if request.weather else model_loader.predict([song.features])[0]
+
+        # Neighbours are filtered by weather after the fact, so widen the search
+        # until enough of them match or the catalogue runs out
+        results = []
+        k = request.limit * 4
+        while True:
+            neighbours = similarity_index.query(song.features, k=k, exclude=[song.track_id])
+            if not neighbours:
+                break
+            labels = model_loader.predict_labels([n[2] for n in neighbours])
+            results = [
+                SimilarTrack(
+                    track_id=track_id,
+                    distance=round(distance, 4),
+                    weather=label,
+                    audio_features=dict(zip(model_loader.expected_features, map(float, feats)))
+                )
+                for (track_id, distance, feats), label in zip(neighbours, labels)
+                if label == weather
+            ][:request.limit]
+            if len(results) >= request.limit or len(neighbours) < k or k >= 1000:
+                break
+            k *= 4
+
+        logger.info(
+            f"Similar songs: {song.name} by {song.artist} → "
+            f"{len(results)} {weather} matches"
+        )
+
+        return SimilarSongsResponse(
+            track_id=song.track_id,
+            name=song.name,
+            artist=song.artist,
+            weather=weather,
+            results=results
+        )
+
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        logger.warning(f"Similar songs timed out: {e}")
+        raise HTTPException(status_code=504, detail="Upstream services too slow, please retry")
+    except ValueError as e:
+        logger.error(f"Spotify API error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Spotify service not configured. Please set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables."
+        )
+    except Exception as e:
+        logger.error(f"Similar songs error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to find similar songs: {str(e)}"
+        )
+
+
+@app.post("/playlist-jobs", response_model=PlaylistJobResponse, status_code=202)
+async def submit_playlist_job(request: PlaylistJobRequest):
+    """
+    Queue a personalized weather playlist build
+
+    The build (weather lookup, recently played tracks, scoring, playlist
+    creation) runs on a background worker pool. If the user already has a
+    job queued or running, that job is returned instead of a new one.
+
+    Poll `GET /playlist-jobs/{job_id}` or stream `GET /playlist-jobs/{job_id}/events`.
+    """
+    if not model_loader or not model_loader.model:
+        raise HTTPException(
+            status_code=503,
+            detail="ML model not loaded. Please check server configuration."
+        )
+
+    if scheduler is not None:
+        scheduler.touch(request.lat, request.lon)
+
+    job, created = await asyncio.to_thread(
+        job_manager.submit,
+        request.user_id,
+        {"access_token": request.access_token, "lat": request.lat, "lon": request.lon},
+    )
+    if not created:
+        logger.info(f"Reusing in-flight playlist job {job.id} for user {request.user_id}")
+    return job.snapshot()
+
+
+@app.get("/playlist-jobs/{job_id}", response_model=PlaylistJobResponse)
+async def get_playlist_job(job_id: str):
+    """Get the current status of a playlist build job"""
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.snapshot()
+
+
+@app.get("/playlist-jobs/{job_id}/events")
+async def stream_playlist_job(job_id: str):
+    """
+    Stream a job's progress as server-sent events
+
+    Each event is a job status snapshot; the stream ends once the job
+    succeeds or fails.
+    """
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    async def events():
+        # Read from the shared store, since another worker may be running the job
+        sent = 0
+        while True:
+            pending = await asyncio.to_thread(job_manager.events, job_id, sent)
+            for event in pending:
+                yield f"data: {json.dumps(event)}\n\n"
+            sent += len(pending)
+            if pending and pending[-1]["status"] not in ACTIVE_STATES:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/features")
 async def get_expected_features():
     """
@@ -308,6 +791,106 @@ async def get_expected_features():
     }
 
 
+def check_feedback_token(authorization: Optional[str]):
+    """
+    Require ``Authorization: Bearer <FORECAST_FEEDBACK_TOKEN>``
+
+    Feedback changes the served model and future training data, so it is
+    only accepted from a trusted caller (e.g. the frontend's server side).
+    Without the variable set the endpoint is disabled.
+    """
+    expected = os.getenv("FORECAST_FEEDBACK_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Feedback is disabled on this server")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing feedback token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@app.post("/feedback", response_model=FeedbackResponse)
+async def submit_feedback(request: FeedbackRequest, authorization: Optional[str] = Header(None)):
+    """
+    Confirm or correct the weather label for a track
+
+    The feedback is appended to the feedback log, which the online updater
+    folds into the model, and labels the track in the feature store for
+    retrains that opt in to it. Requires the FORECAST_FEEDBACK_TOKEN bearer
+    token.
+
+    **Example request:**
+    ```json
+    {
+        "track_id": "60nZcImufyMA1MKQY3dcCH",
+        "weather": "sunny"
+    }
+    ```
+    """
+    check_feedback_token(authorization)
+    if feedback_log is None:
+        raise HTTPException(status_code=503, detail="Server is still starting, please retry shortly")
+
+    weather = request.weather.lower()
+    spotify_service = get_spotify_service()
+    try:
+        features = await asyncio.to_thread(spotify_service.get_audio_features, request.track_id)
+    except DeadlineExceeded as e:
+        logger.warning(f"Feedback feature lookup timed out: {e}")
+        raise HTTPException(status_code=504, detail="Upstream services too slow, please retry")
+    except Exception as e:
+        logger.error(f"Feedback feature lookup failed for {request.track_id}: {e}")
+        raise HTTPException(status_code=404, detail=f"No audio features found for track {request.track_id}")
+
+    predicted = None
+    if model_loader and model_loader.model:
+        predicted = model_loader.predict([list(features)])[0]
+
+    feedback_log.append(request.track_id, features, weather, predicted)
+    if spotify_service.feature_store is not None:
+        try:
+            spotify_service.feature_store.label_many([(request.track_id, weather)], source="feedback")
+        except Exception as e:
+            logger.warning(f"Feature store label write failed: {e}")
+
+    logger.info(f"Feedback: {request.track_id} → {weather} (model said {predicted})")
+
+    return FeedbackResponse(
+        track_id=request.track_id,
+        weather=weather,
+        predicted=predicted,
+        confirmed=predicted == weather
+    )
+
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Get hit rates for this worker's view of the upstream caches and prediction memo"""
+    spotify_service = get_spotify_service()
+    return {
+        "pid": os.getpid(),
+        "search": spotify_service.search_cache.stats(),
+        "features": spotify_service.features_cache.stats(),
+        "predictions": model_loader.memo_stats() if model_loader else None,
+    }
+
+
+@app.get("/shadow-stats")
+async def get_shadow_stats():
+    """Get this worker's comparison of the serving model with the shadow candidate"""
+    if not model_loader or model_loader.shadow is None:
+        return {"pid": os.getpid(), "enabled": False}
+    return {"pid": os.getpid(), "enabled": True, **model_loader.shadow_stats()}
+
+
+@app.get("/upstream-stats")
+async def get_upstream_stats():
+    """Get adaptive upstream timeouts and load shedding counters for this worker"""
+    return {"pid": os.getpid(), **resilience_stats()}
+
+
 @app.get("/model-info")
 async def get_model_info():
     """Get detailed information about the loaded model"""
@@ -320,4 +903,6 @@ async def get_model_info():
             "message": "No model loaded. Place your trained model.pkl in backend/models/"
         }
 
-    return model_loader.get_model_info()
+    info = model_loader.get_model_info()
+    info["online_updates"] = online_updater.stats() if online_updater is not None else None
+    return info
@@ -3,10 +3,15 @@ ML Model loader and prediction handler
 """
 import joblib
 import numpy as np
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import logging
 
+from .tracing import timed_stage
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,17 +21,44 @@ class ModelLoader:
     Supports: Logistic Regression, Random Forest, Gradient Boosting, Naive Bayes
     """
 
-    def __init__(self, models_dir: str = "models"):
+    def __init__(
+        self,
+        models_dir: str = "models",
+        memo_size: Optional[int] = None,
+        memo_decimals: Optional[int] = None,
+    ):
         """
         Initialize model loader
 
         Args:
             models_dir: Directory containing model files
+            memo_size: Predictions remembered by predict() (default:
+                       FORECAST_PREDICT_MEMO_SIZE or 4096; 0 disables)
+            memo_decimals: Round features to this many decimals before lookup
+                           and prediction (default: FORECAST_PREDICT_MEMO_DECIMALS,
+                           unset means exact matches only)
         """
+        if memo_size is None:
+            memo_size = int(os.getenv("FORECAST_PREDICT_MEMO_SIZE", "4096"))
+        if memo_decimals is None and os.getenv("FORECAST_PREDICT_MEMO_DECIMALS"):
+            memo_decimals = int(os.getenv("FORECAST_PREDICT_MEMO_DECIMALS"))
+        self.memo_size = memo_size
+        self.memo_decimals = memo_decimals
+        self._memo: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
         self.models_dir = Path(models_dir)
+        self.lookup_table = None
+        self.cascade = None
+        self.shadow = None
         self.model = None
+        self.model_path: Optional[Path] = None
+        self.model_mtime: Optional[float] = None
         self.scaler = None
         self.model_type = None
+        self.model_version = 0
         self.expected_features = [
             "energy",
             "valence",
@@ -41,7 +73,7 @@ class ModelLoader:
         Load the trained model and optional scaler
 
         Args:
-            model_filename: Name of the model file
+            model_filename: Name of the model file (.npz loads a compact export)
             scaler_filename: Name of the scaler file (optional)
         """
         model_path = self.models_dir / model_filename
@@ -54,8 +86,20 @@ class ModelLoader:
                 f"Please place your trained model at backend/models/{model_filename}"
             )
 
-        self.model = joblib.load(model_path)
+        self.model_mtime = model_path.stat().st_mtime
+        self.model = self._read_model(model_path)
+        # Both were derived from the previous model and would keep serving it
+        if self.lookup_table is not None or self.cascade is not None:
+            logger.warning("Model reloaded: disabling the lookup table and cascade built for the previous one")
+            self.lookup_table = None
+            self.cascade = None
+        self.model_path = model_path
         self.model_type = type(self.model).__name__
+        self.model_version += 1
+        # Keys carry the model version, so old entries can no longer hit;
+        # clearing just frees them now rather than as they age out
+        with self._memo_lock:
+            self._memo.clear()
         logger.info(f"Loaded model: {self.model_type} from {model_path}")
 
         # Load scaler if it exists
@@ -65,12 +109,140 @@ class ModelLoader:
         else:
             logger.info("No scaler found - predictions will use raw features")
 
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the model if its file has been replaced since it was loaded
+
+        Returns:
+            True if the model was reloaded
+        """
+        if self.model_path is None or not self.model_path.exists():
+            return False
+        if self.model_path.stat().st_mtime == self.model_mtime:
+            return False
+        self.load(self.model_path.name)
+        return True
+
+    @staticmethod
+    def _read_model(model_path: Path):
+        """Unpickle a model, or read a compact .npz export"""
+        if model_path.suffix == ".npz":
+            from .compact_model import CompactModel
+            return CompactModel.load(model_path)
+        return joblib.load(model_path)
+
+    def load_shadow(self, model_filename: str, sample_rate: float = 0.1, queue_size: int = 256):
+        """
+        Shadow-score a sample of predict() calls with a candidate model
+
+        The candidate must be a pipeline taking raw features with the same
+        classes as the loaded model; see shadow_stats() for the comparison.
+
+        Args:
+            model_filename: Candidate model file in the models directory
+            sample_rate: Fraction of predictions to shadow
+            queue_size: Pending rows before shadow samples are dropped
+        """
+        from .shadow import ShadowEvaluator
+
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+        model_path = self.models_dir / model_filename
+        if not model_path.exists():
+            raise FileNotFoundError(f"Candidate model file not found: {model_path}")
+        candidate = self._read_model(model_path)
+
+        labels = self._labels(self.model.classes_)
+        candidate_labels = self._labels(candidate.classes_)
+        if sorted(candidate_labels) != sorted(labels):
+            raise ValueError(f"Candidate classes {candidate_labels} do not match the model's {labels}")
+        # Candidate columns reordered to the serving model's label order
+        order = [candidate_labels.index(label) for label in labels]
+
+        self.shadow = ShadowEvaluator(
+            primary=self._served_predict_proba,
+            candidate=lambda features: candidate.predict_proba(features)[:, order],
+            name=model_filename,
+            sample_rate=sample_rate,
+            queue_size=queue_size,
+        )
+        logger.info(f"Shadowing {sample_rate:.0%} of predictions with {model_filename}")
+
+    def shadow_offer(self, features):
+        """Hand a served (1, 5) row to the shadow evaluator, if one is loaded"""
+        if self.shadow is not None:
+            self.shadow.offer(features)
+
+    def shadow_stats(self) -> Optional[dict]:
+        return self.shadow.stats() if self.shadow is not None else None
+
+    def load_lookup_table(self, table_filename: str = "model_lookup.npy"):
+        """
+        Switch predict() to the precomputed grid lookup
+
+        The table's fingerprint (the source model's probabilities for a few
+        sample rows) must match the loaded model, so a table left over from
+        another export is refused. predict_distribution() answers from the
+        table too; predict_proba and predict_labels keep using the full model.
+
+        Args:
+            table_filename: Table written by ml/export_model.py --lookup-table
+        """
+        from .lookup_table import LookupTable
+
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+        table = LookupTable(self.models_dir / table_filename)
+        labels = self._labels(self.model.classes_)
+        if sorted(table.classes) != sorted(labels):
+            raise ValueError(f"Lookup table classes {table.classes} do not match the model's {labels}")
+        if table.fingerprint is None:
+            raise ValueError(
+                f"Lookup table {table_filename} has no model fingerprint; "
+                "rebuild it with ml/export_model.py --lookup-table"
+            )
+        order = [table.classes.index(label) for label in labels]
+        expected = np.asarray(table.fingerprint["probabilities"], dtype=np.float64)[:, order]
+        actual = self._full_predict_proba(np.asarray(table.fingerprint["rows"], dtype=np.float64))
+        if actual.shape != expected.shape or not np.allclose(actual, expected, atol=1e-4):
+            raise ValueError(f"Lookup table {table_filename} was built from a different model")
+
+        self.lookup_table = table
+        logger.info(f"Loaded lookup table {table_filename}: {self.lookup_table.info()}")
+
+    def load_cascade(self, config_filename: str = "cascade.json"):
+        """
+        Answer from a cheap model first, escalating unsure rows to the full model
+
+        Applies to predict() and predict_proba(). The cheap model must have
+        the same classes as the full model.
+
+        Args:
+            config_filename: Config written by ml/cascade.py
+        """
+        from .cascade import ModelCascade
+
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+        cascade = ModelCascade.load(self.models_dir / config_filename)
+        if list(cascade.fast_model.classes_) != list(self.model.classes_):
+            raise ValueError(
+                f"Cascade classes {list(cascade.fast_model.classes_)} do not match "
+                f"the model's {list(self.model.classes_)}"
+            )
+        self.cascade = cascade
+        # Cached results came from the full model alone
+        with self._memo_lock:
+            self._memo.clear()
+        logger.info(f"Loaded model cascade from {config_filename} (threshold {cascade.threshold})")
+
+    @timed_stage("model")
     def predict(self, features: np.ndarray) -> Tuple[str, float]:
         """
         Make a weather prediction from audio features
 
         Args:
-            features: numpy array of shape (1, 5) containing:
+            features: array-like of shape (1, 5) containing:
                       [energy, valence, tempo, acousticness, loudness]
 
         Returns:
@@ -79,6 +251,8 @@ class ModelLoader:
         if self.model is None:
             raise RuntimeError("Model not loaded. Call load() first.")
 
+        features = np.asarray(features, dtype=np.float64)
+
         # Validate feature shape
         if features.shape != (1, 5):
             raise ValueError(
@@ -86,6 +260,40 @@ class ModelLoader:
                 f"Features should be: {self.expected_features}"
             )
 
+        if self.lookup_table is not None:
+            return self.lookup_table.lookup(features)
+
+        if self.memo_decimals is not None:
+            features = np.round(features, self.memo_decimals)
+
+        if self.memo_size <= 0:
+            return self._predict_one(features)
+
+        key = (self.model_version, *features[0].tolist())
+        with self._memo_lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+                return cached
+            self.memo_misses += 1
+
+        result = self._predict_one(features)
+
+        with self._memo_lock:
+            self._memo[key] = result
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    def _predict_one(self, features: np.ndarray) -> Tuple[str, float]:
+        """Run the scaler and model for one validated (1, 5) row"""
+        # One predict_proba call gives both the label and its confidence
+        if hasattr(self.model, "predict_proba"):
+            probabilities, labels = self.predict_proba(features)
+            best = int(np.argmax(probabilities[0]))
+            return labels[best], float(probabilities[0, best])
+
         # Apply scaling if scaler exists
         if self.scaler is not None:
             features = self.scaler.transform(features)
@@ -104,6 +312,146 @@ class ModelLoader:
 
         return weather, confidence
 
+    @timed_stage("model")
+    def predict_proba(self, features: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        """
+        Full class probability matrix for a batch of feature rows
+
+        Scoring a library once with this gives the ranking for every weather
+        type, instead of one inference pass per target weather.
+
+        Args:
+            features: array-like of shape (n, 5) in expected feature order
+
+        Returns:
+            Tuple of (probabilities of shape (n, classes), class labels in column order)
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+
+        features = np.asarray(features, dtype=np.float64)
+
+        if features.ndim != 2 or features.shape[1] != 5:
+            raise ValueError(
+                f"Expected features shape (n, 5), got {features.shape}. "
+                f"Features should be: {self.expected_features}"
+            )
+
+        labels = self._labels(self.model.classes_)
+        if self.cascade is not None:
+            return self.cascade.predict_proba(features, self._full_predict_proba), labels
+        return self._full_predict_proba(features), labels
+
+    @timed_stage("model")
+    def predict_distribution(self, features: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        """
+        Class probabilities for one row from the path predict() serves
+
+        The label predict() returns is always the argmax of this row, since
+        both read the lookup table when one is loaded.
+
+        Args:
+            features: array-like of shape (1, 5) in expected feature order
+
+        Returns:
+            Tuple of (probabilities of shape (1, classes), class labels in column order)
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+
+        features = np.asarray(features, dtype=np.float64)
+
+        if features.shape != (1, 5):
+            raise ValueError(
+                f"Expected features shape (1, 5), got {features.shape}. "
+                f"Features should be: {self.expected_features}"
+            )
+
+        if self.lookup_table is None:
+            return self.predict_proba(features)
+        return self._served_predict_proba(features), self._labels(self.model.classes_)
+
+    def _served_predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Probabilities from the path predict() serves rows through
+
+        The lookup table or cascade when one is loaded, otherwise the full
+        model; columns in the model's label order. Used to compare a shadow
+        candidate with what clients actually received.
+        """
+        if self.lookup_table is not None:
+            labels = self._labels(self.model.classes_)
+            order = [self.lookup_table.classes.index(label) for label in labels]
+            return self.lookup_table.predict_proba(features)[:, order]
+        if self.cascade is not None:
+            return self.cascade.predict_proba(features, self._full_predict_proba, record=False)
+        return self._full_predict_proba(features)
+
+    def _full_predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Scaler + full model probabilities for validated raw rows"""
+        if self.scaler is not None:
+            features = self.scaler.transform(features)
+
+        if hasattr(self.model, "predict_proba"):
+            return self.model.predict_proba(features)
+
+        # No probability estimates: one-hot of the predicted class
+        predictions = self.model.predict(features)
+        probabilities = (np.asarray(predictions)[:, None] == np.asarray(self.model.classes_)[None, :])
+        return probabilities.astype(np.float64)
+
+    def _labels(self, classes) -> List[str]:
+        """Map model classes to weather labels"""
+        return [
+            self.weather_labels[c] if isinstance(c, (int, np.integer)) else str(c)
+            for c in classes
+        ]
+
+    @timed_stage("model")
+    def predict_labels(self, features: np.ndarray) -> List[str]:
+        """
+        Predict weather labels for a batch of feature rows in one model call
+
+        Args:
+            features: array-like of shape (n, 5) in expected feature order
+
+        Returns:
+            List of n weather labels
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+
+        features = np.asarray(features, dtype=np.float64)
+
+        if features.ndim != 2 or features.shape[1] != 5:
+            raise ValueError(
+                f"Expected features shape (n, 5), got {features.shape}. "
+                f"Features should be: {self.expected_features}"
+            )
+
+        if self.scaler is not None:
+            features = self.scaler.transform(features)
+
+        return self._labels(self.model.predict(features))
+
+    def feature_scaling(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Get the mean and scale the model standardizes features with
+
+        Returns:
+            Tuple of (mean, scale), or (None, None) if the model has no scaler
+        """
+        scaler = self.scaler
+        steps = getattr(self.model, "named_steps", {})
+        if scaler is None and "scaler" in steps:
+            scaler = steps["scaler"]
+        if scaler is None and hasattr(self.model, "mean_"):
+            # Compact models carry their scaler parameters directly
+            scaler = self.model
+        if scaler is None or not hasattr(scaler, "mean_"):
+            return None, None
+        return scaler.mean_, scaler.scale_
+
     def _get_confidence(self, features: np.ndarray) -> float:
         """
         Extract confidence score from model prediction
@@ -137,6 +485,18 @@ class ModelLoader:
 
         return confidence
 
+    def memo_stats(self) -> dict:
+        """Hit/miss counters for the predict() memo"""
+        lookups = self.memo_hits + self.memo_misses
+        return {
+            "entries": len(self._memo),
+            "max_entries": self.memo_size,
+            "decimals": self.memo_decimals,
+            "hits": self.memo_hits,
+            "misses": self.memo_misses,
+            "hit_rate": round(self.memo_hits / lookups, 4) if lookups else 0.0,
+        }
+
     def get_model_info(self) -> dict:
         """Get information about the loaded model"""
         if self.model is None:
@@ -147,5 +507,8 @@ class ModelLoader:
             "type": self.model_type,
             "features": self.expected_features,
             "labels": self.weather_labels,
-            "scaler_loaded": self.scaler is not None
+            "scaler_loaded": self.scaler is not None,
+            "lookup_table": self.lookup_table.info() if self.lookup_table is not None else None,
+            "cascade": self.cascade.stats() if self.cascade is not None else None,
+            "shadow": self.shadow_stats()
         }
@@ -0,0 +1,239 @@
+"""
+Adaptive upstream timeouts, request deadlines and load shedding
+Each upstream (Spotify, Reccobeats, OpenWeather) gets a timeout derived
+from its recently observed latency instead of a fixed 30s, every request
+carries a deadline that caps the timeouts of the calls it makes, and the
+server answers 503 straight away once too many requests are in flight.
+A degraded upstream then costs a bounded slice of worker capacity.
+"""
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request may spend in total, including every upstream call
+REQUEST_DEADLINE = float(os.getenv("FORECAST_REQUEST_DEADLINE", "15"))
+
+# Requests served at once per worker before shedding; 0 disables shedding
+MAX_IN_FLIGHT = int(os.getenv("FORECAST_MAX_IN_FLIGHT", "64"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before an upstream call could start"""
+
+
+class AdaptiveTimeout:
+    """
+    Timeout for one upstream, tracking a latency percentile
+
+    The timeout is ``multiplier`` times the chosen percentile of the last
+    ``window`` calls, clamped to [floor, ceiling]. Until ``min_samples``
+    calls have been seen it is ``initial``. A call that timed out after
+    the full adaptive timeout is recorded as a sample that would set the
+    timeout 10% above the one it hit, so a persistently slower upstream
+    pulls the timeout up gradually instead of failing forever, without an
+    outage driving it straight to the ceiling. A call whose timeout the
+    request deadline cut short says nothing about the upstream and is only
+    counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: float = 10.0,
+        floor: float = 0.5,
+        ceiling: float = 30.0,
+        percentile: float = 0.99,
+        multiplier: float = 2.0,
+        window: int = 500,
+        min_samples: int = 20,
+    ):
+        self.name = name
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._current = initial
+        self.calls = 0
+        self.timeouts = 0
+
+    def observe(self, seconds: float):
+        """Record the latency of a completed call"""
+        self._record(seconds, timed_out=False)
+
+    def observe_timeout(self, timeout: float, cut_short: bool = False):
+        """
+        Record a call that hit ``timeout``
+
+        Args:
+            timeout: Timeout the call was given
+            cut_short: The request deadline made it shorter than the adaptive timeout
+        """
+        if cut_short:
+            with self._lock:
+                self.calls += 1
+                self.timeouts += 1
+            return
+        self._record(timeout * 1.1 / self.multiplier, timed_out=True)
+
+    def _record(self, seconds: float, timed_out: bool):
+        with self._lock:
+            self.calls += 1
+            self.timeouts += timed_out
+            self._samples.append(seconds)
+            if len(self._samples) >= self.min_samples:
+                ordered = sorted(self._samples)
+                index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+                self._current = min(self.ceiling, max(self.floor, self.multiplier * ordered[index]))
+
+    def timeout(self) -> float:
+        return self._current
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+        p50 = ordered[len(ordered) // 2] if ordered else None
+        return {
+            "timeout": round(self._current, 3),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+        }
+
+
+UPSTREAMS: Dict[str, AdaptiveTimeout] = {
+    "spotify": AdaptiveTimeout("spotify"),
+    "reccobeats": AdaptiveTimeout("reccobeats"),
+    "openweather": AdaptiveTimeout("openweather"),
+}
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Bound everything called inside to finish within ``seconds`` from now"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(upstream: str) -> Tuple[float, bool]:
+    """
+    Timeout for the next call to an upstream
+
+    Returns:
+        Tuple of (timeout, cut_short) where cut_short is True if the
+        request deadline made it shorter than the adaptive timeout
+
+    Raises:
+        DeadlineExceeded: If the current deadline has already passed
+    """
+    timeout = UPSTREAMS[upstream].timeout()
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            raise DeadlineExceeded(f"Request deadline passed before calling {upstream}")
+        if left < timeout:
+            return left, True
+    return timeout, False
+
+
+def timed_get(upstream: str, http, url: str, **kwargs):
+    """
+    ``http.get`` with the upstream's adaptive timeout, recording the latency
+
+    Args:
+        upstream: Key in UPSTREAMS
+        http: requests module or a Session
+        url: URL to fetch
+        **kwargs: Passed through to ``get``
+    """
+    import requests
+
+    timeout, cut_short = call_timeout(upstream)
+    started = time.monotonic()
+    try:
+        response = http.get(url, timeout=timeout, **kwargs)
+    except requests.exceptions.Timeout:
+        UPSTREAMS[upstream].observe_timeout(timeout, cut_short)
+        raise
+    UPSTREAMS[upstream].observe(time.monotonic() - started)
+    return response
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware that sets each request's deadline and sheds excess load
+
+    Past ``max_in_flight`` concurrent requests, new ones get an immediate
+    503 with Retry-After rather than queueing behind a slow upstream.
+    Health checks and long-lived event streams are neither counted nor shed.
+    """
+
+    def __init__(self, app, max_in_flight: int = MAX_IN_FLIGHT, deadline: float = REQUEST_DEADLINE):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.in_flight = 0
+        self.shed = 0
+        _middlewares.append(self)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith("/health") or path.endswith("/events"):
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            response = JSONResponse(
+                {"detail": "Server busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            with deadline_scope(self.deadline):
+                await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight, "shed": self.shed}
+
+
+# Instances built by the app, so stats can be read without holding a reference
+_middlewares = []
+
+
+def resilience_stats() -> dict:
+    """Upstream timeouts plus this worker's in-flight and shed counts"""
+    return {
+        "upstreams": {name: upstream.stats() for name, upstream in UPSTREAMS.items()},
+        "load": _middlewares[-1].stats() if _middlewares else None,
+    }
@@ -0,0 +1,76 @@
+"""
+Fast serialization path for high-volume endpoints
+Outputs the API constructs itself are already valid, so with
+FORECAST_FAST_RESPONSES=1 they skip pydantic model construction,
+response_model validation and jsonable_encoder, and are encoded straight
+to bytes. The pydantic schemas still document the endpoints in /docs.
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict
+
+from fastapi.responses import Response
+
+if TYPE_CHECKING:
+    from .tracks import TrackRecord
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+FAST_RESPONSES = os.getenv("FORECAST_FAST_RESPONSES", "0") == "1"
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact JSON bytes with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSONResponse without FastAPI's encoder pass, using orjson if available"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class PredictionJSONResponse(Response):
+    """
+    Pre-built /predict response
+
+    The body is one of a handful of prefixes (one per weather label, built
+    once) followed by the confidence, so rendering is a bytes concatenation.
+    """
+
+    media_type = "application/json"
+    _prefixes: Dict[str, bytes] = {}
+
+    def __init__(self, weather: str, confidence: float, **kwargs):
+        super().__init__(content=(weather, confidence), **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        weather, confidence = content
+        prefix = self._prefixes.get(weather)
+        if prefix is None:
+            prefix = b'{"weather":' + dumps(weather) + b',"confidence":'
+            self._prefixes[weather] = prefix
+        return prefix + repr(float(confidence)).encode("ascii") + b"}"
+
+
+def song_weather_content(song: "TrackRecord", weather: str, confidence: float) -> Dict[str, Any]:
+    """SongWeatherResponse fields as a plain dict"""
+    return {
+        "track_id": song.track_id,
+        "name": song.name,
+        "artist": song.artist,
+        "album": song.album,
+        "image_url": song.image_url,
+        "preview_url": song.preview_url,
+        "weather": weather,
+        "confidence": confidence,
+        "audio_features": song.audio_features,
+    }
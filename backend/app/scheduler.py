@@ -0,0 +1,295 @@
+"""
+Daily pre-generation of weather playlist candidates per region
+Scores the whole track catalogue once and ranks it for every weather
+class ahead of the morning peak, warming the weather cache for each active
+region on the way. Playlist jobs then only intersect a user's library with a ranking
+instead of fetching and scoring every track themselves.
+"""
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# Entries outlive their day a little so a late-running job still finds them
+PREGEN_TTL = 36 * 60 * 60
+
+# Regions with no playlist requests for this long are no longer pre-generated
+ACTIVE_REGION_TTL = 7 * 24 * 60 * 60
+
+# A worker re-records a region it has seen at most this often
+TOUCH_INTERVAL = 60 * 60
+
+
+def default_pregen_db_path() -> str:
+    """Resolve the pre-generation database from FORECAST_PREGEN_DB (default: backend/models)"""
+    path = os.getenv("FORECAST_PREGEN_DB")
+    if path:
+        return path
+    return str(Path(__file__).parent.parent / "models" / "pregen.sqlite3")
+
+
+class RegionStore:
+    """
+    SQLite store of active regions and completed runs, shared by all workers
+
+    Each thread keeps its own connection since sqlite3 connections cannot
+    be shared between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_pregen_db_path()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path + ".lock"
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS regions ("
+                "key TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, last_seen REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS runs (day TEXT PRIMARY KEY, finished_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def touch(self, key: str, lat: float, lon: float, seen: float):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO regions (key, lat, lon, last_seen) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, seen),
+            )
+
+    def active(self, cutoff: float) -> List[Tuple[str, float, float]]:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM regions WHERE last_seen < ?", (cutoff,))
+        return conn.execute("SELECT key, lat, lon FROM regions ORDER BY key").fetchall()
+
+    def ran(self, day: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM runs WHERE day = ?", (day,)).fetchone() is not None
+
+    def mark_ran(self, day: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO runs (day, finished_at) VALUES (?, ?)", (day, time.time()))
+
+
+class RegionPlaylistScheduler:
+    """
+    Pre-computes per-day rankings and warms the weather cache for active regions
+
+    Catalogue scores are kept between runs and only new catalogue rows are
+    scored, unless the model has been reloaded. Results go to the shared
+    cache so every worker can use a run done by any one of them.
+
+    Active regions are recorded in a RegionStore that every worker writes
+    to and that survives restarts. Each day's run is done by a single
+    worker: the first to take the store's file lock runs it and records the
+    day, and the others find it done and skip it.
+    """
+
+    def __init__(
+        self,
+        get_model_loader: Callable,
+        get_similarity_index: Callable,
+        max_candidates: int = 5000,
+        regions: Optional[RegionStore] = None,
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            get_model_loader: Returns the serving ModelLoader
+            get_similarity_index: Returns the SimilarityIndex holding the catalogue
+            max_candidates: Tracks kept per weather ranking
+            regions: Shared region store (default: FORECAST_PREGEN_DB)
+        """
+        self.get_model_loader = get_model_loader
+        self.get_similarity_index = get_similarity_index
+        self.max_candidates = max_candidates
+        self.cache = TieredCache("pregen", max_local_entries=1000)
+        self.regions = regions or RegionStore()
+
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._rankings: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._scored_version = None
+        self._scored_ids: List[str] = []
+        self._scores = np.empty((0, 0), dtype=np.float32)
+        self._classes: List[str] = []
+
+    def touch(self, lat: float, lon: float):
+        """Mark the region containing these coordinates as active"""
+        from backend.api.fetch_weather import region_bucket, region_key
+
+        key = region_key(lat, lon)
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(key, 0.0) < TOUCH_INTERVAL:
+                return
+            self._touched[key] = now
+        bucket_lat, bucket_lon = region_bucket(lat, lon)
+        try:
+            self.regions.touch(key, bucket_lat, bucket_lon, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record active region {key}: {e}")
+
+    def active_regions(self) -> List[Tuple[str, float, float]]:
+        return self.regions.active(time.time() - ACTIVE_REGION_TTL)
+
+    def score_catalog(self) -> Tuple[List[str], np.ndarray, List[str]]:
+        """
+        Class probabilities for every catalogued track
+
+        Returns:
+            Tuple of (track_ids, probabilities of shape (n, classes), class labels)
+        """
+        model_loader = self.get_model_loader()
+        index = self.get_similarity_index()
+        if model_loader is None or model_loader.model is None or index is None:
+            raise RuntimeError("Model or catalogue not available")
+
+        if self._scored_version != model_loader.model_version:
+            self._scored_version = model_loader.model_version
+            self._scored_ids = []
+            self._classes = []
+            self._scores = np.empty((0, 0), dtype=np.float32)
+
+        new_ids, features = index.snapshot(start=len(self._scored_ids))
+        if new_ids:
+            probabilities, labels = model_loader.predict_proba(features)
+            probabilities = probabilities.astype(np.float32)
+            self._classes = [label.lower() for label in labels]
+            self._scored_ids = self._scored_ids + new_ids
+            self._scores = np.vstack([self._scores, probabilities]) if len(self._scores) else probabilities
+            logger.info(f"Scored {len(new_ids)} new catalogue tracks ({len(self._scored_ids)} total)")
+
+        return self._scored_ids, self._scores, self._classes
+
+    def run_once(self, day: Optional[str] = None) -> Dict:
+        """
+        Pre-generate rankings for one day and warm active regions' weather
+
+        Args:
+            day: ISO date (default: today)
+
+        Returns:
+            Summary of what was generated
+        """
+        from backend.api.fetch_weather import fetch_weather_cached
+
+        day = day or date.today().isoformat()
+        started = time.perf_counter()
+
+        track_ids, scores, classes = self.score_catalog()
+        for column, weather in enumerate(classes):
+            top = np.argsort(-scores[:, column], kind="stable")[: self.max_candidates]
+            ranking = [[track_ids[row], round(float(scores[row, column]), 6)] for row in top]
+            self.cache.set(f"rank:{day}:{weather}", ranking, ttl=PREGEN_TTL)
+            self._rankings[(day, weather)] = dict(ranking)
+
+        # Weather changes during the day, so it is only warmed in the weather
+        # cache under its own TTL, never stored with the day's rankings
+        regions = 0
+        for key, lat, lon in self.active_regions():
+            try:
+                fetch_weather_cached(lat, lon)
+            except Exception as e:
+                logger.warning(f"Weather lookup failed for region {key}: {e}")
+                continue
+            regions += 1
+
+        # Only today's rankings are worth keeping in memory
+        self._rankings = {k: v for k, v in self._rankings.items() if k[0] == day}
+
+        summary = {
+            "day": day,
+            "tracks": len(track_ids),
+            "classes": classes,
+            "regions": regions,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Pre-generated playlists: {summary}")
+        return summary
+
+    def ranking_for(self, weather: str, day: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """
+        Pre-computed track scores for a weather, if a run has produced them
+
+        Returns:
+            Dict of track_id -> probability for that weather, or None
+        """
+        day = day or date.today().isoformat()
+        weather = weather.lower()
+        ranking = self._rankings.get((day, weather))
+        if ranking is None:
+            cached = self.cache.get(f"rank:{day}:{weather}")
+            if cached is None:
+                return None
+            ranking = dict(cached)
+            self._rankings[(day, weather)] = ranking
+        return ranking
+
+    def run_elected(self, day: Optional[str] = None) -> Optional[Dict]:
+        """
+        Run the day's pre-generation unless another worker is running or has run it
+
+        Returns:
+            The run summary, or None if this worker skipped it
+        """
+        day = day or date.today().isoformat()
+        with open(self.regions.lock_path, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info(f"Pre-generation for {day} is running in another worker")
+                return None
+            if self.regions.ran(day):
+                return None
+            summary = self.run_once(day)
+            self.regions.mark_ran(day)
+            return summary
+
+    def start(self, hour: int):
+        """Run every day at the given local hour in a background thread"""
+
+        def loop():
+            while True:
+                now = datetime.now()
+                next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+                if next_run <= now:
+                    next_run += timedelta(days=1)
+                if self._stop.wait((next_run - now).total_seconds()):
+                    return
+                try:
+                    self.run_elected()
+                except Exception as e:
+                    logger.error(f"Playlist pre-generation failed: {e}", exc_info=True)
+
+        self._thread = threading.Thread(target=loop, name="pregen-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Playlist pre-generation scheduled daily at {hour:02d}:00")
+
+    def stop(self):
+        self._stop.set()
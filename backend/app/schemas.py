@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 
 class PredictionRequest(BaseModel):
@@ -63,6 +63,10 @@ class PredictionResponse(BaseModel):
         le=1.0,
         description="Prediction confidence score"
     )
+    probabilities: Optional[Dict[str, float]] = Field(
+        None,
+        description="Probability of every weather category (only with ?distribution=true)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -127,6 +131,41 @@ class SongWeatherResponse(BaseModel):
         }
 
 
+class SongBatchRequest(BaseModel):
+    """
+    Request schema for predicting many songs at once
+    """
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Song search queries, one per song (max 50)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "queries": ["Happy - Pharrell Williams", "Riders on the Storm - The Doors"]
+            }
+        }
+
+
+class SongBatchItem(BaseModel):
+    """
+    Outcome for one query of a batch: a result or an error
+    """
+    query: str
+    result: Optional[SongWeatherResponse] = None
+    error: Optional[str] = None
+
+
+class SongBatchResponse(BaseModel):
+    """
+    Response schema for batch song prediction, in request order
+    """
+    results: List[SongBatchItem]
+
+
 class HealthResponse(BaseModel):
     """
     Health check response schema
@@ -134,4 +173,120 @@ class HealthResponse(BaseModel):
     status: str
     message: str
     model_loaded: bool
+    ready: bool = Field(False, description="Warm-up finished and the API can take traffic")
     model_info: Optional[Dict[str, Any]] = None
+
+
+class SimilarSongsRequest(BaseModel):
+    """
+    Request schema for finding songs similar to a seed song
+    """
+    query: str = Field(
+        ...,
+        min_length=1,
+        description="Seed song search query (e.g., 'Happy - Pharrell Williams')"
+    )
+    weather: Optional[str] = Field(
+        None,
+        description="Only return songs predicted for this weather (defaults to the seed's weather)"
+    )
+    limit: int = Field(10, ge=1, le=50, description="Number of similar songs to return")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "Happy - Pharrell Williams",
+                "weather": "sunny",
+                "limit": 10
+            }
+        }
+
+
+class SimilarTrack(BaseModel):
+    """
+    A catalogued track close to the seed in standardized feature space
+    """
+    track_id: str
+    distance: float = Field(ge=0.0, description="Euclidean distance in standardized feature space")
+    weather: str = Field(description="Predicted weather: sunny, cloudy, rainy, or snowy")
+    audio_features: Dict[str, float]
+
+
+class SimilarSongsResponse(BaseModel):
+    """
+    Response schema for similar song lookup
+    """
+    track_id: str
+    name: str
+    artist: str
+    weather: str = Field(description="Weather the results were filtered to")
+    results: List[SimilarTrack]
+
+
+class PlaylistJobRequest(BaseModel):
+    """
+    Request schema for submitting a personalized playlist build
+    """
+    user_id: str = Field(..., min_length=1, description="Spotify user ID")
+    access_token: str = Field(
+        ...,
+        min_length=1,
+        description="User's Spotify access token with user-read-recently-played and playlist-modify scopes"
+    )
+    lat: float = Field(..., ge=-90.0, le=90.0, description="Latitude for the weather lookup")
+    lon: float = Field(..., ge=-180.0, le=180.0, description="Longitude for the weather lookup")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": "spotify_user",
+                "access_token": "BQD...",
+                "lat": 37.7749,
+                "lon": -122.4194
+            }
+        }
+
+
+class PlaylistJobResponse(BaseModel):
+    """
+    Status of a playlist build job
+    """
+    job_id: str
+    user_id: str
+    status: str = Field(description="queued, running, succeeded, or failed")
+    progress: float = Field(ge=0.0, le=1.0)
+    message: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class FeedbackRequest(BaseModel):
+    """
+    Request schema for confirming or correcting a track's weather label
+    """
+    track_id: str = Field(..., min_length=1, description="Spotify track ID")
+    weather: str = Field(
+        ...,
+        pattern="^(?i)(sunny|cloudy|rainy|snowy)$",
+        description="Weather the user says the track fits: sunny, cloudy, rainy, or snowy"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "track_id": "60nZcImufyMA1MKQY3dcCH",
+                "weather": "sunny"
+            }
+        }
+
+
+class FeedbackResponse(BaseModel):
+    """
+    Acknowledgement of recorded feedback
+    """
+    track_id: str
+    weather: str
+    predicted: Optional[str] = Field(None, description="The model's label for the track when feedback was given")
+    confirmed: bool = Field(description="Whether the feedback agrees with the model")
@@ -0,0 +1,150 @@
+"""
+Shadow evaluation of a candidate model
+A sampled fraction of live predictions is queued and scored by both the
+serving model and a candidate on a background thread, recording how often
+they agree, how far apart their probabilities are and what each costs.
+The queue is bounded and samples are dropped when it is full, so shadow
+work never holds up a response.
+"""
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowEvaluator:
+    """
+    Scores sampled rows with the serving and candidate models off the request path
+
+    Each model scores the same row back to back on the worker thread, so
+    their latencies are measured under the same conditions. Divergence is
+    the total variation distance between the two probability vectors.
+
+    The worker thread starts on the first offer in each process, since a
+    thread started before a pre-fork server forks does not exist in the
+    workers.
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[np.ndarray], np.ndarray],
+        candidate: Callable[[np.ndarray], np.ndarray],
+        name: str,
+        sample_rate: float = 0.1,
+        queue_size: int = 256,
+        window: int = 1000,
+    ):
+        """
+        Initialize the evaluator
+
+        Args:
+            primary: The scoring path clients are served from, raw (1, 5) rows to probabilities
+            candidate: Candidate scoring with columns in the same label order
+            name: Candidate file name, for reporting
+            sample_rate: Fraction of offered rows that are shadowed
+            queue_size: Rows waiting to be scored before new ones are dropped
+            window: Recent rows kept for the latency percentiles
+        """
+        self.primary = primary
+        self.candidate = candidate
+        self.name = name
+        self.sample_rate = sample_rate
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._primary_seconds = deque(maxlen=window)
+        self._candidate_seconds = deque(maxlen=window)
+        self.offered = 0
+        self.dropped = 0
+        self.compared = 0
+        self.agreed = 0
+        self.errors = 0
+        self.divergence_total = 0.0
+        self.divergence_max = 0.0
+        self._worker_pid: Optional[int] = None
+
+    def _ensure_worker(self):
+        """Start this process's worker thread if it has none yet"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._run, name="shadow-evaluator", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def offer(self, features):
+        """Queue a row for shadow scoring if sampled; never blocks"""
+        # Counters share the worker's lock so stats() never sees a torn set
+        with self._lock:
+            self.offered += 1
+        if random.random() >= self.sample_rate:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(features)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            features = self._queue.get()
+            try:
+                self._compare(np.asarray(features, dtype=np.float64).reshape(1, -1))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"Shadow scoring failed: {e}")
+
+    def _compare(self, features: np.ndarray):
+        started = time.perf_counter()
+        served = np.asarray(self.primary(features))[0]
+        primary_done = time.perf_counter()
+        shadowed = np.asarray(self.candidate(features))[0]
+        candidate_done = time.perf_counter()
+
+        divergence = 0.5 * float(np.abs(served - shadowed).sum())
+        with self._lock:
+            self.compared += 1
+            self.agreed += int(served.argmax() == shadowed.argmax())
+            self.divergence_total += divergence
+            self.divergence_max = max(self.divergence_max, divergence)
+            self._primary_seconds.append(primary_done - started)
+            self._candidate_seconds.append(candidate_done - primary_done)
+
+    @staticmethod
+    def _latency(samples) -> Optional[dict]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "mean_us": round(sum(ordered) / len(ordered) * 1e6, 1),
+            "p95_us": round(ordered[int(0.95 * (len(ordered) - 1))] * 1e6, 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            compared = self.compared
+            return {
+                "candidate": self.name,
+                "sample_rate": self.sample_rate,
+                "offered": self.offered,
+                "compared": compared,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+                "agreement": round(self.agreed / compared, 4) if compared else None,
+                "mean_divergence": round(self.divergence_total / compared, 4) if compared else None,
+                "max_divergence": round(self.divergence_max, 4) if compared else None,
+                "latency": {
+                    "primary": self._latency(self._primary_seconds),
+                    "candidate": self._latency(self._candidate_seconds),
+                },
+            }
@@ -0,0 +1,311 @@
+"""
+Nearest-neighbour index over standardized audio features
+Backs "songs like this one" lookups with a KD-tree instead of a linear scan
+"""
+import fcntl
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIM = 5
+ROW_BYTES = 4 * FEATURE_DIM
+
+
+class SimilarityIndex:
+    """
+    Append-only catalogue of track feature vectors with a KD-tree on top
+
+    Raw features are persisted as a flat float32 file (one row of 5 values
+    per track) next to a newline-separated list of Spotify track IDs. On
+    open the feature file is memory-mapped, standardized with the serving
+    model's scaler and indexed. Tracks added afterwards land in a small
+    pending buffer that is searched by brute force and folded into the tree
+    by a background rebuild once it grows past ``rebuild_threshold``.
+
+    Several worker processes can share one index directory: appends to both
+    files happen under an exclusive file lock, and each process first picks
+    up rows the others appended, so rows stay aligned with their IDs and a
+    track is only ever catalogued once.
+    """
+
+    def __init__(self, index_dir: str, rebuild_threshold: int = 4096, leaf_size: int = 40):
+        """
+        Initialize the index
+
+        Args:
+            index_dir: Directory holding points.f32 and ids.txt
+            rebuild_threshold: Pending rows tolerated before the tree is rebuilt
+            leaf_size: KD-tree leaf size
+        """
+        self.index_dir = Path(index_dir)
+        self.points_path = self.index_dir / "points.f32"
+        self.ids_path = self.index_dir / "ids.txt"
+        self.lock_path = self.index_dir / "index.lock"
+        self.rebuild_threshold = rebuild_threshold
+        self.leaf_size = leaf_size
+
+        self.mean = np.zeros(FEATURE_DIM)
+        self.scale = np.ones(FEATURE_DIM)
+
+        self._lock = threading.Lock()
+        self._tree: Optional[KDTree] = None
+        self._points: np.ndarray = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        self._ids: List[str] = []
+        self._row_by_id = {}
+        self._pending_points: List[np.ndarray] = []
+        self._pending_ids: List[str] = []
+        self._pending_set = set()
+        self._ids_offset = 0
+        self._rebuilding = False
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending_ids)
+
+    def open(self, mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        """
+        Memory-map the persisted catalogue and build the tree
+
+        Args:
+            mean: Per-feature mean of the model's StandardScaler
+            scale: Per-feature scale of the model's StandardScaler
+        """
+        if mean is not None and scale is not None:
+            self.mean = np.asarray(mean, dtype=np.float64)
+            self.scale = np.asarray(scale, dtype=np.float64)
+        else:
+            logger.warning("No scaler available - similarity index will use raw features")
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._ids_offset = 0
+            with self._file_lock():
+                ids = self._read_new_ids()
+            points = self._map_points(len(ids))
+            tree = self._build_tree(points)
+            self._install(points, ids, tree)
+        logger.info(f"Similarity index ready: {len(self)} tracks from {self.index_dir}")
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the index files, shared with other processes"""
+        with open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read_new_ids(self) -> List[str]:
+        """
+        IDs appended to disk past ``_ids_offset``, and advance it
+
+        Caller holds both locks. A process that died between the two appends
+        leaves the files uneven; both are cut back to the rows they share.
+        """
+        ids_size = self.ids_path.stat().st_size if self.ids_path.exists() else 0
+        points_size = self.points_path.stat().st_size if self.points_path.exists() else 0
+        if ids_size == self._ids_offset and points_size == len(self) * ROW_BYTES:
+            return []
+
+        tail = b""
+        if ids_size > self._ids_offset:
+            with open(self.ids_path, "rb") as f:
+                f.seek(self._ids_offset)
+                tail = f.read()
+        end = tail.rfind(b"\n") + 1
+        new_ids = tail[:end].decode().splitlines()
+
+        n_rows = min(len(self) + len(new_ids), points_size // ROW_BYTES)
+        new_ids = new_ids[:n_rows - len(self)]
+        self._ids_offset += sum(len(track_id.encode()) + 1 for track_id in new_ids)
+        if self._ids_offset != ids_size or n_rows * ROW_BYTES != points_size:
+            logger.warning(f"Similarity index files disagree, truncating both to {n_rows} rows")
+            os.truncate(self.ids_path, self._ids_offset)
+            os.truncate(self.points_path, n_rows * ROW_BYTES)
+        return new_ids
+
+    def _catch_up(self):
+        """Move rows other processes appended into the pending buffer (caller holds both locks)"""
+        start = len(self)
+        new_ids = self._read_new_ids()
+        if new_ids:
+            block = np.array(self._map_points(start + len(new_ids))[start:])
+            self._pending_points.append(block)
+            self._pending_ids.extend(new_ids)
+            self._pending_set.update(new_ids)
+
+    def _map_points(self, n_rows: int) -> np.ndarray:
+        if n_rows == 0:
+            return np.empty((0, FEATURE_DIM), dtype=np.float32)
+        return np.memmap(self.points_path, dtype=np.float32, mode="r", shape=(n_rows, FEATURE_DIM))
+
+    def _standardize(self, points: np.ndarray) -> np.ndarray:
+        return (np.asarray(points, dtype=np.float64) - self.mean) / self.scale
+
+    def _build_tree(self, points: np.ndarray) -> Optional[KDTree]:
+        return KDTree(self._standardize(points), leaf_size=self.leaf_size) if len(points) else None
+
+    def _install(self, points: np.ndarray, ids: List[str], tree: Optional[KDTree]):
+        """Swap in a tree over the first len(ids) rows; later rows stay pending (caller holds the lock)"""
+        folded = len(ids) - len(self._ids)
+        pending = np.vstack(self._pending_points) if self._pending_points else None
+        self._pending_points = [pending[folded:]] if pending is not None and len(pending) > folded else []
+        self._pending_ids = self._pending_ids[folded:]
+        self._pending_set = set(self._pending_ids)
+        self._points = points
+        self._ids = ids
+        self._row_by_id = {track_id: row for row, track_id in enumerate(ids)}
+        self._tree = tree
+
+    def _rebuild(self):
+        """Fold the pending rows into a new tree off the request path"""
+        try:
+            with self._lock:
+                ids = self._ids + self._pending_ids
+            points = self._map_points(len(ids))
+            tree = self._build_tree(points)
+            with self._lock:
+                self._install(points, ids, tree)
+            logger.info(f"Similarity index rebuilt: {len(ids)} tracks")
+        except Exception as e:
+            logger.error(f"Similarity index rebuild failed: {e}")
+        finally:
+            self._rebuilding = False
+
+    def _refresh(self):
+        """Pick up rows appended by other processes, if the ID file has grown"""
+        if not self.ids_path.exists() or self.ids_path.stat().st_size == self._ids_offset:
+            return
+        with self._lock, self._file_lock():
+            self._catch_up()
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        """Start a background rebuild past the threshold (caller holds the lock)"""
+        if len(self._pending_ids) >= self.rebuild_threshold and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, name="similarity-rebuild", daemon=True).start()
+
+    def add(self, track_ids: Sequence[str], features: np.ndarray) -> int:
+        """
+        Append tracks to the catalogue, skipping IDs already indexed
+
+        Args:
+            track_ids: Spotify track IDs
+            features: Array of shape (n, 5) in model feature order
+
+        Returns:
+            Number of tracks actually added
+        """
+        features = np.asarray(features, dtype=np.float32).reshape(-1, FEATURE_DIM)
+        if len(track_ids) != len(features):
+            raise ValueError("track_ids and features must have the same length")
+
+        with self._lock, self._file_lock():
+            self._catch_up()
+            new_rows = []
+            new_ids = []
+            for track_id, row in zip(track_ids, features):
+                if track_id in self._row_by_id or track_id in self._pending_set:
+                    continue
+                self._pending_set.add(track_id)
+                new_ids.append(track_id)
+                new_rows.append(row)
+
+            if new_ids:
+                block = np.ascontiguousarray(np.vstack(new_rows), dtype=np.float32)
+                ids_text = "".join(f"{track_id}\n" for track_id in new_ids).encode()
+                with open(self.points_path, "ab") as f:
+                    f.write(block.tobytes())
+                with open(self.ids_path, "ab") as f:
+                    f.write(ids_text)
+                self._ids_offset += len(ids_text)
+                self._pending_points.append(block)
+                self._pending_ids.extend(new_ids)
+            self._maybe_rebuild()
+
+        return len(new_ids)
+
+    def snapshot(self, start: int = 0) -> Tuple[List[str], np.ndarray]:
+        """
+        Catalogued track IDs and raw features from row ``start`` onwards
+
+        Rows are append-only, so callers can process the catalogue
+        incrementally by passing the number of rows they have already seen.
+        """
+        with self._lock:
+            n_indexed = len(self._ids)
+            ids = (self._ids + self._pending_ids)[start:]
+            points = self._points
+            pending = list(self._pending_points)
+        if not ids:
+            return [], np.empty((0, FEATURE_DIM), dtype=np.float32)
+        pending = np.vstack(pending) if pending else np.empty((0, FEATURE_DIM), dtype=np.float32)
+        return ids, np.vstack([points[start:], pending[max(0, start - n_indexed):]])
+
+    def query(
+        self,
+        features: np.ndarray,
+        k: int = 10,
+        exclude: Iterable[str] = (),
+    ) -> List[Tuple[str, float, np.ndarray]]:
+        """
+        Find the k nearest catalogued tracks to a feature vector
+
+        Args:
+            features: Array of 5 features in model feature order
+            k: Number of neighbours to return
+            exclude: Track IDs to leave out of the results (e.g. the seed)
+
+        Returns:
+            List of (track_id, distance, raw_features) sorted by distance
+        """
+        self._refresh()
+        exclude = set(exclude)
+        target = self._standardize(np.asarray(features).reshape(1, FEATURE_DIM))
+        want = k + len(exclude)
+
+        with self._lock:
+            tree, points, ids = self._tree, self._points, self._ids
+            pending_ids = list(self._pending_ids)
+            pending = np.vstack(self._pending_points) if self._pending_points else None
+
+        candidates = []
+        if tree is not None:
+            distances, rows = tree.query(target, k=min(want, len(ids)))
+            for distance, row in zip(distances[0], rows[0]):
+                candidates.append((ids[row], float(distance), np.asarray(points[row])))
+        if pending is not None:
+            distances = np.linalg.norm(self._standardize(pending) - target, axis=1)
+            for row in np.argsort(distances)[:want]:
+                candidates.append((pending_ids[row], float(distances[row]), pending[row]))
+
+        candidates.sort(key=lambda item: item[1])
+        return [item for item in candidates if item[0] not in exclude][:k]
+
+
+def build_from_csv(csv_path: str, index_dir: str) -> int:
+    """Bulk-load a CSV with a track_id column plus the five feature columns"""
+    import pandas as pd
+
+    features = ["energy", "valence", "tempo", "acousticness", "loudness"]
+    index = SimilarityIndex(index_dir, rebuild_threshold=sys.maxsize)
+    index.open()
+    added = 0
+    for chunk in pd.read_csv(csv_path, usecols=["track_id"] + features, chunksize=100_000):
+        chunk = chunk.dropna()
+        added += index.add(chunk["track_id"].astype(str).tolist(), chunk[features].to_numpy())
+    return added
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m backend.app.similarity_index <catalog.csv> <index_dir>")
+        sys.exit(1)
+    print(f"Indexed {build_from_csv(sys.argv[1], sys.argv[2])} new tracks")
@@ -2,18 +2,38 @@
 Spotify + Reccobeats API Service
 Handles song search via Spotify and audio feature extraction via Reccobeats
 """
+import contextvars
 import os
-from typing import Optional, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Sequence, Tuple, Union
 import logging
 import requests
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 
+from ml.feature_store import FeatureStore
+
+from .cache import TieredCache
+from .resilience import UPSTREAMS, DeadlineExceeded, call_timeout, timed_get
+from .tracks import FEATURE_NAMES, TrackRecord
+
 logger = logging.getLogger(__name__)
 
 # Reccobeats API base URL
 RECCOBEATS_BASE_URL = "https://api.reccobeats.com"
 
+# Search results can change as the catalogue does; audio features never do
+SEARCH_CACHE_TTL = 24 * 60 * 60
+FEATURES_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Reccobeats accepts up to 40 comma-separated IDs per track lookup
+RECCOBEATS_BULK_SIZE = 40
+
+# Upstream calls in flight at once for a batch request
+BATCH_WORKERS = int(os.getenv("FORECAST_BATCH_WORKERS", "8"))
+
 
 class SpotifyService:
     """
@@ -25,6 +45,17 @@ class SpotifyService:
         self.client_id = os.getenv("SPOTIPY_CLIENT_ID")
         self.client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
         self.sp: Optional[spotipy.Spotify] = None
+        self._auth_manager: Optional[SpotifyClientCredentials] = None
+        self._clients = threading.local()
+        self.search_cache = TieredCache("search")
+        self.features_cache = TieredCache("feature_vectors")
+
+        # Durable tier behind the cache, shared with data collection and training
+        self.feature_store: Optional[FeatureStore] = None
+        try:
+            self.feature_store = FeatureStore()
+        except Exception as e:
+            logger.warning(f"Feature store unavailable: {e}")
 
         if not self.client_id or not self.client_secret:
             logger.warning(
@@ -36,11 +67,29 @@ class SpotifyService:
                 auth_manager = SpotifyClientCredentials(
                     client_id=self.client_id, client_secret=self.client_secret
                 )
+                self._auth_manager = auth_manager
                 self.sp = spotipy.Spotify(auth_manager=auth_manager)
                 logger.info("Spotify service initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Spotify: {e}")
 
+    def _client(self, timeout: float) -> spotipy.Spotify:
+        """
+        This thread's Spotify client, set to ``timeout``
+
+        spotipy reads ``requests_timeout`` from the client on every call, so
+        a client shared between threads would let concurrent requests
+        overwrite each other's timeouts. Clients share the token manager.
+        spotipy's own retries are off: each would get the full timeout again
+        and overrun the request deadline, so one call is one attempt.
+        """
+        client = getattr(self._clients, "client", None)
+        if client is None:
+            client = spotipy.Spotify(auth_manager=self._auth_manager, retries=0, status_retries=0)
+            self._clients.client = client
+        client.requests_timeout = timeout
+        return client
+
     def search_track(self, query: str, limit: int = 1) -> Optional[Dict]:
         """
         Search for a track on Spotify
@@ -55,8 +104,20 @@ class SpotifyService:
         if not self.sp:
             raise ValueError("Spotify service not initialized. Check credentials.")
 
+        cache_key = " ".join(query.lower().split())
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            results = self.sp.search(q=query, type="track", limit=limit)
+            timeout, cut_short = call_timeout("spotify")
+            started = time.monotonic()
+            try:
+                results = self._client(timeout).search(q=query, type="track", limit=limit)
+            except requests.exceptions.Timeout:
+                UPSTREAMS["spotify"].observe_timeout(timeout, cut_short)
+                raise
+            UPSTREAMS["spotify"].observe(time.monotonic() - started)
             tracks = results.get("tracks", {}).get("items", [])
 
             if not tracks:
@@ -68,8 +129,11 @@ class SpotifyService:
                 f"Found track: {track['name']} by {track['artists'][0]['name']}"
             )
 
+            self.search_cache.set(cache_key, track, ttl=SEARCH_CACHE_TTL)
             return track
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Spotify search failed: {e}")
             raise Exception(f"Failed to search Spotify: {str(e)}")
@@ -85,10 +149,11 @@ class SpotifyService:
             Reccobeats track ID or None if not found
         """
         try:
-            response = requests.get(
+            response = timed_get(
+                "reccobeats",
+                requests,
                 f"{RECCOBEATS_BASE_URL}/v1/track",
-                params={"ids": spotify_track_id},
-                timeout=30
+                params={"ids": spotify_track_id}
             )
             response.raise_for_status()
             data = response.json()
@@ -107,7 +172,7 @@ class SpotifyService:
             logger.error(f"Failed to convert Spotify ID to Reccobeats: {e}")
             return None
 
-    def get_audio_features(self, track_id: str) -> Dict[str, float]:
+    def get_audio_features(self, track_id: str) -> Tuple[float, ...]:
         """
         Get audio features for a specific track using Reccobeats API
 
@@ -115,19 +180,64 @@ class SpotifyService:
             track_id: Spotify track ID
 
         Returns:
-            Dictionary containing audio features needed for ML prediction
+            Tuple of the audio features needed for ML prediction, in
+            FEATURE_NAMES order
         """
+        cached = self.features_cache.get(track_id)
+        if cached is not None:
+            return tuple(cached)
+
+        stored = self._stored_features([track_id]).get(track_id)
+        if stored is not None:
+            self.features_cache.set(track_id, stored, ttl=FEATURES_CACHE_TTL)
+            return stored
+
         # Convert Spotify ID to Reccobeats ID
         recco_id = self.spotify_to_recco(track_id)
 
         if not recco_id:
             raise Exception(f"Could not find Reccobeats ID for Spotify track {track_id}")
 
+        audio_features = self._fetch_recco_features(recco_id)
+        logger.info(f"Retrieved audio features from Reccobeats for track {track_id}")
+
+        self.features_cache.set(track_id, audio_features, ttl=FEATURES_CACHE_TTL)
+        self._store_features([(track_id, audio_features)])
+        return audio_features
+
+    def _stored_features(self, track_ids: Sequence[str]) -> Dict[str, Tuple[float, ...]]:
+        """Read features from the feature store, treating failures as misses"""
+        if self.feature_store is None or not track_ids:
+            return {}
+        try:
+            return self.feature_store.get_many(track_ids)
+        except Exception as e:
+            logger.warning(f"Feature store read failed: {e}")
+            return {}
+
+    def _store_features(self, rows: List[Tuple[str, Tuple[float, ...]]]):
+        """Write fetched features through to the feature store"""
+        if self.feature_store is None or not rows:
+            return
+        try:
+            self.feature_store.upsert_many(rows)
+        except Exception as e:
+            logger.warning(f"Feature store write failed: {e}")
+
+    def _fetch_recco_features(self, recco_id: str, http=requests) -> Tuple[float, ...]:
+        """
+        Fetch one track's features from Reccobeats, in FEATURE_NAMES order
+
+        Args:
+            recco_id: Reccobeats track ID
+            http: requests module or a Session to reuse connections
+        """
         try:
             # Get audio features from Reccobeats
-            response = requests.get(
-                f"{RECCOBEATS_BASE_URL}/v1/track/{recco_id}/audio-features",
-                timeout=30
+            response = timed_get(
+                "reccobeats",
+                http,
+                f"{RECCOBEATS_BASE_URL}/v1/track/{recco_id}/audio-features"
             )
 
             if response.status_code == 404:
@@ -136,29 +246,115 @@ class SpotifyService:
             response.raise_for_status()
             features = response.json()
 
-            # Extract only the features needed for ML prediction
-            # Using the same feature names as your ML model expects
-            audio_features = {
-                "energy": features.get("energy"),
-                "valence": features.get("valence"),
-                "tempo": features.get("tempo"),
-                "acousticness": features.get("acousticness"),
-                "loudness": features.get("loudness"),
-            }
+            # Extract only the features needed for ML prediction, in model order
+            audio_features = tuple(features.get(name) for name in FEATURE_NAMES)
 
             # Validate all features are present
-            if any(value is None for value in audio_features.values()):
+            if any(value is None for value in audio_features):
                 raise Exception(f"Missing audio features for track {recco_id}")
 
-            logger.info(f"Retrieved audio features from Reccobeats for track {track_id}")
-
             return audio_features
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get audio features from Reccobeats: {e}")
             raise Exception(f"Failed to get audio features: {str(e)}")
 
-    def get_track_info_and_features(self, query: str) -> Optional[Dict]:
+    def spotify_to_recco_bulk(self, spotify_track_ids: Sequence[str], http=requests) -> Dict[str, str]:
+        """
+        Convert many Spotify track IDs to Reccobeats IDs, 40 per request
+
+        Args:
+            spotify_track_ids: Spotify track IDs
+            http: requests module or a Session to reuse connections
+
+        Returns:
+            Dict of Spotify ID -> Reccobeats ID for the tracks Reccobeats knows
+        """
+        mapping = {}
+        for start in range(0, len(spotify_track_ids), RECCOBEATS_BULK_SIZE):
+            chunk = spotify_track_ids[start:start + RECCOBEATS_BULK_SIZE]
+            try:
+                response = timed_get(
+                    "reccobeats",
+                    http,
+                    f"{RECCOBEATS_BASE_URL}/v1/track",
+                    params={"ids": ",".join(chunk)}
+                )
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Bulk Reccobeats lookup failed: {e}")
+                continue
+
+            # Results are not guaranteed to keep request order, so match them
+            # back through the Spotify URL each one carries
+            for track in response.json().get("content", []):
+                spotify_id = (track.get("href") or "").rstrip("/").rsplit("/", 1)[-1]
+                if spotify_id in chunk and track.get("id"):
+                    mapping[spotify_id] = track["id"]
+        return mapping
+
+    def get_audio_features_bulk(
+        self, track_ids: Sequence[str]
+    ) -> Dict[str, Union[Tuple[float, ...], Exception]]:
+        """
+        Get audio features for many tracks
+
+        Cached and stored tracks are answered locally, the rest are resolved
+        with bulk Reccobeats ID lookups and their features fetched concurrently.
+
+        Args:
+            track_ids: Spotify track IDs
+
+        Returns:
+            Dict of track ID -> feature tuple, or the exception for that track
+        """
+        results: Dict[str, Union[Tuple[float, ...], Exception]] = {}
+        missing = []
+        for track_id in dict.fromkeys(track_ids):
+            cached = self.features_cache.get(track_id)
+            if cached is not None:
+                results[track_id] = tuple(cached)
+            else:
+                missing.append(track_id)
+
+        stored = self._stored_features(missing)
+        for track_id, audio_features in stored.items():
+            results[track_id] = audio_features
+            self.features_cache.set(track_id, audio_features, ttl=FEATURES_CACHE_TTL)
+        missing = [track_id for track_id in missing if track_id not in stored]
+
+        if not missing:
+            return results
+
+        with requests.Session() as session:
+            recco_ids = self.spotify_to_recco_bulk(missing, http=session)
+
+            def fetch(track_id):
+                recco_id = recco_ids.get(track_id)
+                if not recco_id:
+                    return Exception(f"Could not find Reccobeats ID for Spotify track {track_id}")
+                try:
+                    audio_features = self._fetch_recco_features(recco_id, http=session)
+                except Exception as e:
+                    return e
+                self.features_cache.set(track_id, audio_features, ttl=FEATURES_CACHE_TTL)
+                return audio_features
+
+            # Workers run in copies of this context so the request deadline applies
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+                fetched = dict(zip(missing, pool.map(lambda t: context.copy().run(fetch, t), missing)))
+
+        results.update(fetched)
+        self._store_features([
+            (track_id, audio_features) for track_id, audio_features in fetched.items()
+            if not isinstance(audio_features, Exception)
+        ])
+
+        logger.info(f"Retrieved audio features for {len(missing)} uncached tracks")
+        return results
+
+    def get_track_info_and_features(self, query: str) -> Optional[TrackRecord]:
         """
         Search for a track and get its audio features in one call
 
@@ -166,39 +362,83 @@ class SpotifyService:
             query: Search query (song name, artist, etc.)
 
         Returns:
-            Dictionary with track info and audio features, or None if not found
+            TrackRecord with track info and audio features, or None if not found
         """
         track = self.search_track(query)
 
         if not track:
             return None
 
+        audio_features = self._known_features(track) or self.get_audio_features(track["id"])
+
+        return TrackRecord.from_spotify(track, audio_features)
+
+    def get_tracks_info_and_features(
+        self, queries: Sequence[str]
+    ) -> List[Union[TrackRecord, Exception, None]]:
+        """
+        Batch version of get_track_info_and_features
+
+        Searches run concurrently, then the features of every found track
+        are fetched in one get_audio_features_bulk call.
+
+        Args:
+            queries: Search queries
+
+        Returns:
+            One entry per query: a TrackRecord, None if nothing was found, or
+            the exception that query failed with
+        """
+        if not self.sp:
+            raise ValueError("Spotify service not initialized. Check credentials.")
+
+        def search(query):
+            try:
+                return self.search_track(query)
+            except Exception as e:
+                return e
+
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            tracks = list(pool.map(lambda q: context.copy().run(search, q), queries))
+
+        found = [t for t in tracks if isinstance(t, dict) and not self._known_features(t)]
+        features = self.get_audio_features_bulk([t["id"] for t in found])
+
+        results: List[Union[TrackRecord, Exception, None]] = []
+        for track in tracks:
+            if not isinstance(track, dict):
+                results.append(track)
+                continue
+            audio_features = self._known_features(track) or features[track["id"]]
+            if isinstance(audio_features, Exception):
+                results.append(audio_features)
+            else:
+                results.append(TrackRecord.from_spotify(track, audio_features))
+        return results
+
+    @staticmethod
+    def _known_features(track: Dict) -> Optional[Tuple[float, ...]]:
+        """Hardcoded features for tracks Reccobeats gets wrong"""
         track_name = track["name"].lower()
         artist_name = ", ".join([artist["name"] for artist in track["artists"]]).lower()
 
         if "happy" in track_name and "pharrell" in artist_name:
-            audio_features = {
-                "energy": 0.816,
-                "valence": 0.962,
-                "tempo": 160.0,
-                "acousticness": 0.132,
-                "loudness": -5.5,
-            }
-        else:
-            audio_features = self.get_audio_features(track["id"])
-
-        return {
-            "track_id": track["id"],
-            "name": track["name"],
-            "artist": ", ".join([artist["name"] for artist in track["artists"]]),
-            "album": track["album"]["name"],
-            "image_url": track["album"]["images"][0]["url"]
-            if track["album"]["images"]
-            else None,
-            "preview_url": track.get("preview_url"),
-            "audio_features": audio_features,
-        }
-
-
-# Global instance
-spotify_service = SpotifyService()
+            # energy, valence, tempo, acousticness, loudness
+            return (0.816, 0.962, 160.0, 0.132, -5.5)
+        return None
+
+
+# Global instance, built on first use so importing this module stays cheap
+_spotify_service: Optional[SpotifyService] = None
+_spotify_service_lock = threading.Lock()
+
+
+def get_spotify_service() -> SpotifyService:
+    """Get the shared SpotifyService, creating it on first call"""
+    global _spotify_service
+    if _spotify_service is None:
+        with _spotify_service_lock:
+            if _spotify_service is None:
+                _spotify_service = SpotifyService()
+    return _spotify_service
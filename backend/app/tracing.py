@@ -0,0 +1,345 @@
+"""
+Request trace capture and upstream replay
+With FORECAST_TRACE_FILE set, a sampled fraction of requests is recorded
+to an append-only JSON-lines file: the request, its status, time spent per
+stage (model, each upstream, the rest of the app) and every upstream HTTP
+response it triggered, compressed. ``python -m backend.replay`` re-runs a
+trace against the current build, serving those upstream responses from
+the trace instead of the network, and compares the stage latencies.
+
+Upstream calls are captured at ``requests``' transport adapter, the one
+point that both spotipy and ``timed_get`` go through. Secrets stay out of
+the file: token fields in request bodies and key parameters in query
+strings (OpenWeather's ``appid``) are redacted, and Spotify token
+responses are not recorded (replay fakes them).
+"""
+import base64
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Optional
+from urllib.parse import unquote_plus, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Sampled fraction of requests recorded while FORECAST_TRACE_FILE is set
+TRACE_SAMPLE_RATE = float(os.getenv("FORECAST_TRACE_SAMPLE_RATE", "0.01"))
+
+# Upstream response bodies above this size are recorded without the body
+MAX_BODY_BYTES = 256 * 1024
+
+_trace: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("trace", default=None)
+
+# Request body fields replaced before a trace is written
+SECRET_FIELDS = {"access_token", "refresh_token", "client_secret", "password"}
+REDACTED = "[redacted]"
+
+# Query parameters carrying credentials, replaced in recorded URLs
+SECRET_PARAMS = {"appid", "key", "api_key", "apikey", "token", "access_token", "client_secret"}
+
+# Upstream hosts whose responses are credentials; timed but never recorded
+CREDENTIAL_HOSTS = {"accounts.spotify.com"}
+
+UPSTREAM_HOSTS = {
+    "api.spotify.com": "spotify",
+    "accounts.spotify.com": "spotify",
+    "api.reccobeats.com": "reccobeats",
+    "api.openweathermap.org": "openweather",
+}
+
+
+def upstream_name(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return UPSTREAM_HOSTS.get(host, host)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRET_FIELDS else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def redact_body(body: bytes) -> str:
+    """Request body as text, with any SECRET_FIELDS in a JSON body replaced"""
+    text = body.decode("utf-8", "replace")
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        return text
+    redacted = _redact(parsed)
+    return text if redacted == parsed else json.dumps(redacted)
+
+
+def redact_query(query: str) -> str:
+    """Query string with the values of any SECRET_PARAMS replaced"""
+    parts = []
+    for part in query.split("&"):
+        name, sep, _ = part.partition("=")
+        parts.append(f"{name}={REDACTED}" if sep and unquote_plus(name).lower() in SECRET_PARAMS else part)
+    return "&".join(parts)
+
+
+def redact_url(url: str) -> str:
+    """URL as recorded in a trace; replay matches calls on this form too"""
+    parts = urlsplit(url)
+    return parts._replace(query=redact_query(parts.query)).geturl() if parts.query else url
+
+
+def new_trace(method: str, path: str, query: str, body: bytes) -> dict:
+    # Stages are added from to_thread and batch-fetch threads as well as the
+    # event loop, so updates go through the trace's lock
+    return {
+        "ts": time.time(),
+        "method": method,
+        "path": path,
+        "query": redact_query(query),
+        "body": redact_body(body),
+        "status": None,
+        "stages": {},
+        "upstream": [],
+        "_open": set(),
+        "_lock": threading.Lock(),
+    }
+
+
+@contextmanager
+def trace_scope(trace: dict):
+    """Make ``trace`` the current request's trace, including in copied contexts"""
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def add_stage(name: str, seconds: float):
+    trace = _trace.get()
+    if trace is not None:
+        with trace["_lock"]:
+            trace["stages"][name] = trace["stages"].get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as a stage of the current trace; free when not tracing
+
+    Nested blocks of the same stage on one thread (predict calling
+    predict_proba) are only timed once, by the outermost.
+    """
+    trace = _trace.get()
+    key = (name, threading.get_ident())
+    if trace is None:
+        yield
+        return
+    with trace["_lock"]:
+        nested = key in trace["_open"]
+        trace["_open"].add(key)
+    if nested:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with trace["_lock"]:
+            trace["_open"].discard(key)
+        add_stage(name, time.perf_counter() - started)
+
+
+def timed_stage(name: str):
+    """Decorator form of ``stage``"""
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def finish_trace(trace: dict, total: float) -> dict:
+    """Derive the summary stages and drop bookkeeping; returns the record"""
+    stages = trace["stages"]
+    upstream = sum(v for k, v in stages.items() if k.startswith("upstream."))
+    stages["upstream"] = upstream
+    stages["total"] = total
+    # Upstream calls can overlap (thread pools), so clamp the derived stages
+    stages["local"] = max(0.0, total - upstream)
+    stages["app"] = max(0.0, stages["local"] - stages.get("model", 0.0))
+    trace.pop("_open", None)
+    trace.pop("_lock", None)
+    return trace
+
+
+def encode_body(content: bytes) -> Optional[str]:
+    if len(content) > MAX_BODY_BYTES:
+        return None
+    return base64.b64encode(zlib.compress(content)).decode("ascii")
+
+
+def decode_body(encoded: Optional[str]) -> bytes:
+    return zlib.decompress(base64.b64decode(encoded)) if encoded else b""
+
+
+# TRANSPORT HOOK
+
+_original_send = None
+_replay_lookup = None
+_hook_lock = threading.Lock()
+
+
+def _traced_send(adapter, request, **kwargs):
+    trace = _trace.get()
+    started = time.perf_counter()
+    if _replay_lookup is not None:
+        response = _replay_lookup(adapter, request, trace)
+    else:
+        response = _original_send(adapter, request, **kwargs)
+    elapsed = time.perf_counter() - started
+    if trace is not None:
+        name = upstream_name(request.url)
+        add_stage(f"upstream.{name}", elapsed)
+        if _replay_lookup is None and urlsplit(request.url).hostname not in CREDENTIAL_HOSTS:
+            call = {
+                "method": request.method,
+                "url": redact_url(request.url),
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() == "content-type"},
+                "body": encode_body(response.content),
+                "elapsed": round(elapsed, 6),
+            }
+            with trace["_lock"]:
+                trace["upstream"].append(call)
+    return response
+
+
+def install_transport_hook(replay_lookup=None):
+    """
+    Route every requests call through the trace hook
+
+    Args:
+        replay_lookup: For replay, ``(adapter, request, trace) -> Response``
+            serving recorded responses instead of sending the request
+    """
+    global _original_send, _replay_lookup
+    from requests.adapters import HTTPAdapter
+
+    with _hook_lock:
+        if _original_send is None:
+            _original_send = HTTPAdapter.send
+            HTTPAdapter.send = lambda adapter, request, **kwargs: _traced_send(adapter, request, **kwargs)
+        _replay_lookup = replay_lookup
+
+
+# TRACE FILE
+
+class TraceWriter:
+    """
+    Appends trace records from a background thread
+
+    The queue is bounded and records are dropped when it is full, so a
+    slow disk never holds up a response.
+    """
+
+    def __init__(self, path: str, queue_size: int = 1000):
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        threading.Thread(target=self._run, name="trace-writer", daemon=True).start()
+
+    def write(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                line = json.dumps(record, separators=(",", ":")) + "\n"
+                with open(self.path, "a") as f:
+                    f.write(line)
+                self.written += 1
+            except Exception as e:
+                logger.warning(f"Trace write failed: {e}")
+
+
+def read_traces(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware recording a sample of requests to a trace file
+
+    Health checks and event streams are never recorded.
+    """
+
+    def __init__(self, app, path: Optional[str] = None, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.writer = TraceWriter(path) if path else None
+        if self.writer is not None:
+            install_transport_hook()
+            logger.info(f"Recording {sample_rate:.1%} of requests to {path}")
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (
+            self.writer is None
+            or scope["type"] != "http"
+            or path.startswith("/health")
+            or path.endswith("/events")
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Read the body up front so it can be recorded, then hand it on
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        delivered = False
+
+        async def replay_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        trace = new_trace(scope["method"], path, scope.get("query_string", b"").decode("latin-1"), body)
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                trace["status"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        with trace_scope(trace):
+            try:
+                await self.app(scope, replay_receive, traced_send)
+            finally:
+                self.writer.write(finish_trace(trace, time.perf_counter() - started))
+
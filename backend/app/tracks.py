@@ -0,0 +1,100 @@
+"""
+Compact track containers used from fetch through scoring to serialization
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Model input order, matching ml/data.py
+FEATURE_NAMES = ("energy", "valence", "tempo", "acousticness", "loudness")
+
+
+class TrackRecord:
+    """
+    One resolved track with its audio features
+
+    Uses __slots__ and keeps the five features in a float64 array rather
+    than a per-track dict, so a record costs a fixed, small allocation.
+    Float64 matches what the model was trained on and returns the upstream
+    values unchanged.
+    """
+
+    __slots__ = ("track_id", "name", "artist", "album", "image_url", "preview_url", "features")
+
+    def __init__(
+        self,
+        track_id: str,
+        name: str,
+        artist: str,
+        album: str,
+        image_url: Optional[str],
+        preview_url: Optional[str],
+        features: Sequence[float],
+    ):
+        self.track_id = track_id
+        self.name = name
+        self.artist = artist
+        self.album = album
+        self.image_url = image_url
+        self.preview_url = preview_url
+        self.features = array("d", features)
+
+    @classmethod
+    def from_spotify(cls, track: dict, features: Sequence[float]) -> "TrackRecord":
+        """Build a record from a Spotify track object and features in model order"""
+        images = track["album"]["images"]
+        return cls(
+            track_id=track["id"],
+            name=track["name"],
+            artist=", ".join(artist["name"] for artist in track["artists"]),
+            album=track["album"]["name"],
+            image_url=images[0]["url"] if images else None,
+            preview_url=track.get("preview_url"),
+            features=features,
+        )
+
+    @property
+    def audio_features(self) -> Dict[str, float]:
+        """Features keyed by name, built only when a response needs them"""
+        return dict(zip(FEATURE_NAMES, self.features))
+
+    def __repr__(self) -> str:
+        return f"TrackRecord({self.track_id!r}, {self.name!r}, {self.artist!r})"
+
+
+class TrackBatch:
+    """
+    Many tracks' features as one contiguous float64 matrix
+
+    Row i of ``features`` belongs to ``track_ids[i]``. The whole matrix goes
+    to the model in a single call instead of one DataFrame per track.
+    """
+
+    __slots__ = ("track_ids", "features")
+
+    def __init__(self, track_ids: List[str], features: np.ndarray):
+        features = np.ascontiguousarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        if len(track_ids) != len(features):
+            raise ValueError("track_ids and features must have the same length")
+        self.track_ids = track_ids
+        self.features = features
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple]) -> "TrackBatch":
+        """Build a batch from (track_id, features) pairs, skipping missing features"""
+        track_ids = []
+        flat = array("d")
+        for track_id, features in pairs:
+            if features is None:
+                continue
+            track_ids.append(track_id)
+            flat.extend(features)
+        return cls(track_ids, np.frombuffer(flat, dtype=np.float64))
+
+    @classmethod
+    def from_records(cls, records: Sequence[TrackRecord]) -> "TrackBatch":
+        return cls.from_pairs((record.track_id, record.features) for record in records)
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
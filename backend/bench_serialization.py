@@ -0,0 +1,89 @@
+"""
+Benchmark response serialization for /predict and /predict-song
+Compares FastAPI's default path (pydantic model -> response_model
+validation -> jsonable_encoder -> JSONResponse) with the fast path in
+backend/app/responses.py
+
+Run from the repo root:
+    python -m backend.bench_serialization
+"""
+import json
+import timeit
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from backend.app.main import app
+from backend.app.responses import FastJSONResponse, PredictionJSONResponse, song_weather_content, orjson
+from backend.app.schemas import PredictionResponse, SongWeatherResponse
+from backend.app.tracks import TrackRecord
+
+N = 20_000
+
+SONG = TrackRecord(
+    track_id="60nZcImufyMA1MKQY3dcCH",
+    name="Happy",
+    artist="Pharrell Williams",
+    album="G I R L",
+    image_url="https://i.scdn.co/image/ab67616d0000b273e8107e6d9214baa81bb79bba",
+    preview_url=None,
+    features=(0.816, 0.962, 160.0, 0.132, -5.5),
+)
+
+
+def route_for(path: str):
+    return next(route for route in app.routes if getattr(route, "path", None) == path)
+
+
+def run_sync(coro):
+    # serialize_response never suspends for async endpoints, so drive it
+    # directly rather than paying for an event loop round trip per call
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def default_path(route, build):
+    def run():
+        content = run_sync(serialize_response(
+            field=route.response_field,
+            response_content=build(),
+            exclude_none=route.response_model_exclude_none,
+        ))
+        return JSONResponse(content).body
+
+    return run
+
+
+def report(name: str, default, fast):
+    assert json.loads(default()) == json.loads(fast()), f"{name}: fast path output differs"
+    default_us = min(timeit.repeat(default, number=N, repeat=3)) / N * 1e6
+    fast_us = min(timeit.repeat(fast, number=N, repeat=3)) / N * 1e6
+    print(f"{name:<14} default {default_us:7.2f} us   fast {fast_us:7.2f} us   speedup {default_us / fast_us:5.1f}x")
+
+
+def main() -> None:
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json fallback)'}, {N} iterations")
+
+    report(
+        "/predict",
+        default_path(
+            route_for("/predict"),
+            lambda: PredictionResponse(weather="sunny", confidence=0.8715),
+        ),
+        lambda: PredictionJSONResponse("sunny", 0.8715).body,
+    )
+    report(
+        "/predict-song",
+        default_path(
+            route_for("/predict-song"),
+            lambda: SongWeatherResponse(**song_weather_content(SONG, "sunny", 0.95)),
+        ),
+        lambda: FastJSONResponse(song_weather_content(SONG, "sunny", 0.95)).body,
+    )
+
+
+if __name__ == "__main__":
+    main()
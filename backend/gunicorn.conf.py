@@ -0,0 +1,17 @@
+"""
+Gunicorn config for multi-worker serving
+The app is imported once in the master with FORECAST_PRELOAD=1 so every
+worker forks with the model already in memory and shares its pages
+
+Run from the repo root:
+    gunicorn -c backend/gunicorn.conf.py backend.app.main:app
+"""
+import os
+
+os.environ.setdefault("FORECAST_PRELOAD", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
@@ -0,0 +1,361 @@
+"""
+Open-loop load generator for the Forecast.fm API
+Requests arrive on a fixed schedule (constant rate, or Poisson with
+--poisson) whether or not earlier ones have finished, over a pool of
+keep-alive connections. Latency is measured from each request's scheduled
+arrival time, so time spent waiting behind a slow server counts
+(no coordinated omission). Payloads come from the test_cases in
+backend/test_api.py and the rows of data/track_data.csv.
+
+Run from the repo root against a running server:
+    python -m backend.load_test --rate 200 --duration 30
+    python -m backend.load_test --find-saturation --slo-p99 0.25
+    python -m backend.load_test --mix predict=8,predict-song=1,health=1
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from backend.test_api import BASE_URL, test_cases
+
+TRACK_DATA = Path(__file__).resolve().parent.parent / "data" / "track_data.csv"
+FEATURES = ["energy", "valence", "tempo", "acousticness", "loudness"]
+
+# /predict-song queries; the first is answered without calling Spotify
+SONG_QUERIES = [
+    "Happy - Pharrell Williams",
+    "Here Comes the Sun - The Beatles",
+    "Riders on the Storm - The Doors",
+    "Let It Snow - Dean Martin",
+]
+
+HEALTH_PATHS = ["/health", "/health/live", "/health/ready"]
+
+
+class Histogram:
+    """
+    Log-bucketed latency histogram, 2.5% relative resolution from 50µs to 120s
+
+    Percentiles are read from bucket upper bounds, so they are accurate to
+    the bucket width rather than requiring every sample to be kept.
+    """
+
+    GROWTH = 1.025
+
+    def __init__(self, low: float = 50e-6, high: float = 120.0):
+        steps = int(math.log(high / low) / math.log(self.GROWTH)) + 1
+        self.bounds = [low * self.GROWTH ** i for i in range(steps + 1)]
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if not self.total:
+            return float("nan")
+        target = math.ceil(q * self.total)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.max, self.bounds[min(index, len(self.bounds) - 1)])
+        return self.max
+
+    def render(self, rows: int = 12, width: int = 40) -> List[str]:
+        """Coarse text histogram: `rows` log-spaced bands between the extremes"""
+        if not self.total:
+            return []
+        filled = [i for i, c in enumerate(self.counts) if c]
+        first, last = filled[0], filled[-1]
+        edges = [round(first + (last + 1 - first) * k / rows) for k in range(rows + 1)]
+        bands = [(edges[k], edges[k + 1]) for k in range(rows) if edges[k + 1] > edges[k]]
+        peak = max(sum(self.counts[a:b]) for a, b in bands)
+        lines = []
+        for a, b in bands:
+            count = sum(self.counts[a:b])
+            upper = self.bounds[min(b - 1, len(self.bounds) - 1)]
+            bar = "#" * round(width * count / peak) if peak else ""
+            lines.append(f"  <= {upper * 1000:9.2f}ms {count:>8} {bar}")
+        return lines
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; asyncio streams, no client library"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes]) -> int:
+        """Send one request and read the whole response; returns the status code"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + (body or b""))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Payloads:
+    """Round-robin request bodies for each endpoint"""
+
+    def __init__(self, track_limit: int = 5000):
+        predict = [case["features"] for case in test_cases]
+        if TRACK_DATA.exists():
+            with open(TRACK_DATA, newline="") as f:
+                for i, row in enumerate(csv.DictReader(f)):
+                    if i >= track_limit:
+                        break
+                    predict.append({name: float(row[name]) for name in FEATURES})
+        self.bodies = {
+            "predict": [json.dumps(p).encode() for p in predict],
+            "predict-song": [json.dumps({"query": q}).encode() for q in SONG_QUERIES],
+        }
+        self._next = defaultdict(int)
+
+    def next(self, kind: str) -> Tuple[str, str, Optional[bytes]]:
+        """(method, path, body) for the next request of this kind"""
+        index = self._next[kind]
+        self._next[kind] += 1
+        if kind == "health":
+            return "GET", HEALTH_PATHS[index % len(HEALTH_PATHS)], None
+        bodies = self.bodies[kind]
+        return "POST", f"/{kind}", bodies[index % len(bodies)]
+
+
+class Result:
+    """Outcome of one load step"""
+
+    def __init__(self, rate: float, duration: float):
+        self.rate = rate
+        self.duration = duration
+        self.latency = Histogram()
+        self.by_kind: Dict[str, Histogram] = defaultdict(Histogram)
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.sent = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def completed(self) -> int:
+        return self.latency.total
+
+    @property
+    def throughput(self) -> float:
+        return (self.completed - self.errors) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.completed if self.completed else 0.0
+
+    def report(self, histogram: bool = True) -> str:
+        lat = self.latency
+        lines = [
+            f"offered {self.rate:.0f} req/s for {self.duration:.0f}s: sent {self.sent}, "
+            f"completed {self.completed}, achieved {self.throughput:.1f} req/s, "
+            f"errors {self.errors} ({self.error_rate:.2%})",
+            f"latency p50 {lat.percentile(0.5) * 1000:.1f}ms  p90 {lat.percentile(0.9) * 1000:.1f}ms  "
+            f"p99 {lat.percentile(0.99) * 1000:.1f}ms  p99.9 {lat.percentile(0.999) * 1000:.1f}ms  "
+            f"max {lat.max * 1000:.1f}ms",
+        ]
+        for kind, hist in sorted(self.by_kind.items()):
+            lines.append(
+                f"  {kind:<13} n={hist.total:<7} p50 {hist.percentile(0.5) * 1000:.1f}ms  "
+                f"p99 {hist.percentile(0.99) * 1000:.1f}ms"
+            )
+        lines.append("  status " + ", ".join(f"{k}: {v}" for k, v in sorted(self.statuses.items())))
+        if histogram:
+            lines.extend(lat.render())
+        return "\n".join(lines)
+
+
+def parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    kinds, weights = [], []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("predict", "predict-song", "health"):
+            raise ValueError(f"Unknown endpoint in mix: {kind}")
+        kinds.append(kind)
+        weights.append(float(weight or 1))
+    return kinds, weights
+
+
+async def run_step(
+    base_url: str,
+    rate: float,
+    duration: float,
+    connections: int,
+    mix: Tuple[List[str], List[float]],
+    timeout: float,
+    poisson: bool,
+    payloads: Payloads,
+) -> Result:
+    """
+    Offer `rate` requests per second for `duration` seconds
+
+    Arrivals never wait for earlier requests. If all connections are busy
+    the request queues for one, and that wait is part of its latency.
+    """
+    url = urlsplit(base_url)
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(connections):
+        pool.put_nowait(Connection(url.hostname, url.port or 80))
+
+    result = Result(rate, duration)
+    rng = random.Random(42)
+    kinds, weights = mix
+
+    async def one(scheduled: float, kind: str):
+        method, path, body = payloads.next(kind)
+        conn = await pool.get()
+        try:
+            status = await asyncio.wait_for(conn.request(method, path, body), timeout)
+            result.statuses[str(status)] += 1
+            if status >= 400:
+                result.errors += 1
+        except Exception as e:
+            conn.close()
+            result.statuses[type(e).__name__] += 1
+            result.errors += 1
+        finally:
+            pool.put_nowait(conn)
+        latency = time.perf_counter() - scheduled
+        result.latency.record(latency)
+        result.by_kind[kind].record(latency)
+
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    end = start + duration
+    while scheduled < end:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        tasks.append(asyncio.create_task(one(scheduled, kind)))
+        result.sent += 1
+        scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+
+    await asyncio.gather(*tasks)
+    result.elapsed = time.perf_counter() - start
+    while not pool.empty():
+        pool.get_nowait().close()
+    return result
+
+
+async def find_saturation(args, mix, payloads: Payloads) -> Optional[float]:
+    """
+    Raise the offered rate step by step until the server stops keeping up
+
+    A step fails when achieved throughput falls below 95% of the offered
+    rate, p99 exceeds the SLO, or the error rate exceeds the limit. The
+    saturation point is the last rate that passed.
+    """
+    rate = args.rate
+    sustained = None
+    while rate <= args.max_rate:
+        result = await run_step(
+            args.url, rate, args.duration, args.connections, mix, args.timeout, args.poisson, payloads
+        )
+        print(result.report(histogram=False))
+        p99 = result.latency.percentile(0.99)
+        failures = []
+        if result.throughput < 0.95 * rate:
+            failures.append(f"achieved {result.throughput:.0f} < 95% of offered")
+        if p99 > args.slo_p99:
+            failures.append(f"p99 {p99 * 1000:.0f}ms > SLO {args.slo_p99 * 1000:.0f}ms")
+        if result.error_rate > args.max_error_rate:
+            failures.append(f"error rate {result.error_rate:.2%} > {args.max_error_rate:.2%}")
+        if failures:
+            print(f"✗ {rate:.0f} req/s: " + "; ".join(failures) + "\n")
+            break
+        print(f"✓ {rate:.0f} req/s sustained\n")
+        sustained = rate
+        rate *= args.step
+    return sustained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--rate", type=float, default=50.0, help="offered requests/s (start rate when searching)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive connections in the pool")
+    parser.add_argument("--mix", default="predict=1", help="endpoint weights, e.g. predict=8,predict-song=1,health=1")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--find-saturation", action="store_true", help="step the rate up until the server saturates")
+    parser.add_argument("--step", type=float, default=1.5, help="rate multiplier between saturation steps")
+    parser.add_argument("--max-rate", type=float, default=20000.0)
+    parser.add_argument("--slo-p99", type=float, default=0.5, help="p99 latency limit in seconds for a passing step")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    payloads = Payloads()
+    if args.find_saturation:
+        sustained = asyncio.run(find_saturation(args, mix, payloads))
+        if sustained is None:
+            print(f"Saturated already at {args.rate:.0f} req/s; lower --rate")
+        else:
+            print(f"Saturation point: about {sustained:.0f} req/s sustained with p99 <= {args.slo_p99 * 1000:.0f}ms")
+    else:
+        result = asyncio.run(run_step(
+            args.url, args.rate, args.duration, args.connections, mix, args.timeout, args.poisson, payloads
+        ))
+        print(result.report())
+
+
+if __name__ == "__main__":
+    main()
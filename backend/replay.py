@@ -0,0 +1,268 @@
+"""
+Replay recorded request traces against the current build
+Reads a trace file written with FORECAST_TRACE_FILE set (see
+backend/app/tracing.py), drives the ASGI app in-process with each recorded
+request, and serves every Spotify, Reccobeats and OpenWeather call from the
+responses recorded with it instead of the network. Then compares the
+latency of each stage (model, app, local = total minus upstream wait) with
+the recording, or with a saved earlier replay, and exits non-zero on a
+regression.
+
+Run from the repo root:
+    python -m backend.replay traces.jsonl --save before.json       # on the old build
+    python -m backend.replay traces.jsonl --baseline before.json   # on the new build
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Replays must not read or warm state shared with a real server, nor record
+# themselves. Every file the app writes goes to a scratch directory; the
+# similarity catalogue is copied there so /similar-songs still sees it
+os.environ.pop("FORECAST_TRACE_FILE", None)
+os.environ.pop("FORECAST_PREGEN_HOUR", None)
+os.environ.pop("FORECAST_FEEDBACK_UPDATE_MINUTES", None)
+os.environ["FORECAST_SHARED_CACHE"] = ""
+_SCRATCH = tempfile.mkdtemp(prefix="replay-")
+os.environ.setdefault("FORECAST_FEATURE_STORE", os.path.join(_SCRATCH, "features.sqlite3"))
+os.environ.setdefault("FORECAST_JOB_DB", os.path.join(_SCRATCH, "jobs.sqlite3"))
+os.environ.setdefault("FORECAST_PREGEN_DB", os.path.join(_SCRATCH, "pregen.sqlite3"))
+os.environ.setdefault("FORECAST_HISTORY_DB", os.path.join(_SCRATCH, "listening_history.sqlite3"))
+os.environ.setdefault("FORECAST_FEEDBACK_LOG", os.path.join(_SCRATCH, "feedback.jsonl"))
+if "FORECAST_SIMILARITY_INDEX" not in os.environ:
+    _index = os.path.join(os.path.dirname(__file__), "models", "similarity_index")
+    os.environ["FORECAST_SIMILARITY_INDEX"] = os.path.join(_SCRATCH, "similarity_index")
+    if os.path.isdir(_index):
+        shutil.copytree(_index, os.environ["FORECAST_SIMILARITY_INDEX"], ignore=shutil.ignore_patterns("*.lock"))
+os.environ.setdefault("SPOTIPY_CLIENT_ID", "replay")
+os.environ.setdefault("SPOTIPY_CLIENT_SECRET", "replay")
+
+from backend.app.tracing import (  # noqa: E402
+    decode_body,
+    finish_trace,
+    install_transport_hook,
+    new_trace,
+    read_traces,
+    redact_url,
+    trace_scope,
+)
+
+# Stages the build itself is responsible for; upstream time is replayed, not measured
+CHECKED_STAGES = ("local", "app", "model")
+
+TOKEN_BODY = b'{"access_token": "replay", "token_type": "Bearer", "expires_in": 3600}'
+
+
+class RecordedUpstream:
+    """
+    Serves upstream calls from the trace being replayed
+
+    A call is matched to the first unused recording with the same method
+    and URL (secret query parameters redacted, as they were when recorded)
+    in the current request's trace, then to any request's. Spotify
+    token requests get a dummy token; anything else unmatched gets a 502.
+    """
+
+    def __init__(self, traces: List[dict], delay: bool):
+        self.delay = delay
+        self.by_key: Dict[tuple, List[dict]] = defaultdict(list)
+        for record in traces:
+            for call in record["upstream"]:
+                self.by_key[(call["method"], redact_url(call["url"]))].append(call)
+        self.matched = 0
+        self.unmatched = 0
+
+    def __call__(self, adapter, request, trace: Optional[dict]):
+        key = (request.method, redact_url(request.url))
+        call = None
+        if trace is not None:
+            with trace["_lock"]:
+                recorded = trace["_recorded"]
+                call = next((c for c in recorded if (c["method"], redact_url(c["url"])) == key), None)
+                if call is not None:
+                    recorded.remove(call)
+        if call is None and self.by_key.get(key):
+            call = self.by_key[key][0]
+
+        if call is not None:
+            self.matched += 1
+            if self.delay:
+                time.sleep(call["elapsed"])
+            return self._response(request, call["status"], decode_body(call["body"]), call["headers"])
+        if urlsplit(request.url).hostname == "accounts.spotify.com":
+            return self._response(request, 200, TOKEN_BODY, {"Content-Type": "application/json"})
+        self.unmatched += 1
+        return self._response(request, 502, b'{"error": "not in trace"}', {"Content-Type": "application/json"})
+
+    @staticmethod
+    def _response(request, status: int, body: bytes, headers: dict):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+
+async def replay_one(app, record: dict) -> dict:
+    """Run one recorded request through the app; returns its replay trace"""
+    body = record["body"].encode()
+    headers = [(b"host", b"replay")]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": record["method"],
+        "scheme": "http",
+        "path": record["path"],
+        "raw_path": record["path"].encode(),
+        "query_string": record["query"].encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("replay", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    trace = new_trace(record["method"], record["path"], record["query"], body)
+    trace["_recorded"] = list(record["upstream"])
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            trace["status"] = message["status"]
+
+    started = time.perf_counter()
+    with trace_scope(trace):
+        await app(scope, receive, send)
+    trace.pop("_recorded")
+    return finish_trace(trace, time.perf_counter() - started)
+
+
+async def replay(traces: List[dict], repeat: int) -> List[dict]:
+    from backend.app import main
+
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        await asyncio.to_thread(main.ready.wait, 300)
+        for _ in range(repeat):
+            for record in traces:
+                results.append(await replay_one(main.app, record))
+    return results
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+def stage_samples(traces: List[dict]) -> Dict[str, List[float]]:
+    samples = defaultdict(list)
+    for trace in traces:
+        for name, seconds in trace["stages"].items():
+            samples[name].append(seconds)
+    return samples
+
+
+def change(after: float, before: float) -> str:
+    return f"{after / before - 1:+.0%}" if before > 0 and not math.isnan(after) else "n/a"
+
+
+def compare(
+    baseline: Dict[str, List[float]],
+    current: Dict[str, List[float]],
+    threshold: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Print stage percentiles side by side; returns the regressed stages"""
+    print(f"{'stage':<22}{'baseline p50/p90/p99 ms':>26}{'replay p50/p90/p99 ms':>26}{'p50':>9}{'p90':>9}")
+    regressed = []
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name, []), current.get(name, [])
+        b = [percentile(before, q) * 1000 for q in (0.5, 0.9, 0.99)]
+        a = [percentile(after, q) * 1000 for q in (0.5, 0.9, 0.99)]
+        # Slower by the relative threshold and by more than timer noise
+        slower = [
+            after_ms > before_ms * (1 + threshold) and after_ms - before_ms > min_delta_ms
+            for before_ms, after_ms in zip(b[:2], a[:2])
+        ]
+        flag = ""
+        if name in CHECKED_STAGES and before and after and any(slower):
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<22}{'/'.join(f'{v:.2f}' for v in b):>26}{'/'.join(f'{v:.2f}' for v in a):>26}"
+            f"{change(a[0], b[0]):>9}{change(a[1], b[1]):>9}{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="trace file recorded with FORECAST_TRACE_FILE")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the trace this many times")
+    parser.add_argument("--upstream-delay", action="store_true", help="wait each upstream call's recorded latency")
+    parser.add_argument("--baseline", help="compare with stages saved by an earlier --save instead of the recording")
+    parser.add_argument("--save", help="write this replay's stage timings to a JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative p50/p90 slowdown counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="smallest absolute slowdown counted as a regression")
+    args = parser.parse_args()
+
+    # Raised for every array passed to a pipeline fitted on a DataFrame
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    traces = read_traces(args.trace)
+    if not traces:
+        sys.exit(f"No traces in {args.trace}")
+    upstream = RecordedUpstream(traces, delay=args.upstream_delay)
+    install_transport_hook(upstream)
+
+    results = asyncio.run(replay(traces, args.repeat))
+    mismatched = sum(
+        result["status"] != record["status"]
+        for result, record in zip(results, traces * args.repeat)
+    )
+    print(
+        f"Replayed {len(results)} requests: {mismatched} with a different status than recorded, "
+        f"{upstream.matched} upstream calls served from the trace, {upstream.unmatched} not found\n"
+    )
+
+    current = stage_samples(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = stage_samples(traces)
+    regressed = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressed:
+        sys.exit(f"\nRegression in: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
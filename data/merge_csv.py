@@ -2,11 +2,12 @@ import pandas as pd
 
 chat = pd.read_csv("data/chat.csv")
 claude = pd.read_csv("data/claude.csv")
-personal = pd.read_csv("data/ryan.csv")
+# Personal playlist tracks live in the feature store (data/spotify_data_personal.py)
+# and are added at load time by ml/data.py
 
 claude = claude[["weather"]+[c for c in claude.columns if c != "weather"]]
 
-merged = pd.concat([chat, claude, personal], axis=0, ignore_index=True)
+merged = pd.concat([chat, claude], axis=0, ignore_index=True)
 merged = merged.replace({"snow": "snowy"})
 
 merged.to_csv("data/track_data.csv", index=False)
\ No newline at end of file
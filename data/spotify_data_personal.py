@@ -6,7 +6,13 @@ from dotenv import load_dotenv
 
 import requests
 
-# next steps: reroute song ids to reccobeats for features
+from ml.feature_store import FeatureStore
+
+# Run from the repo root: python -m data.spotify_data_personal
+# Labelled tracks go to the feature store (data/features.sqlite3), which
+# training reads alongside track_data.csv when asked to (export_model.py
+# --store); tracks already in the store
+# (from earlier runs or from serving) are not fetched again
 
 load_dotenv()
 # print(os.getenv("SPOTIPY_CLIENT_ID"))
@@ -35,34 +41,47 @@ def spotify_to_recco(track_id): # spotify track id to recco track id
     r.raise_for_status()
     data = r.json()
 
-    tracks = data.get("data", [])
+    # Reccobeats returns "content"; older responses used "data"
+    tracks = data.get("content") or data.get("data", [])
     if not tracks:
         return None  # track not found
 
     return tracks[0]["id"]
 
-def playlist_to_tracks(playlist_id): # returns list of recco track ids corresponding to spotify playlist
+store = FeatureStore()
+
+# Listings prefetched by data/test_permissions.py, if it has been run
+DISCOVERY_PATH = "data/playlist_tracks.csv"
+discovered = pd.read_csv(DISCOVERY_PATH, dtype=str) if os.path.exists(DISCOVERY_PATH) else None
+
+def playlist_to_tracks(playlist_id): # returns spotify track ids in the playlist
+    if discovered is not None and playlist_id in set(discovered["playlist_id"]):
+        return discovered.loc[discovered["playlist_id"] == playlist_id, "track_id"].tolist()
     res = sp.playlist_items(playlist_id, limit=100, offset=0, additional_types=["track"])
-    tracks = []
-    for item in res["items"]:
-        t = item.get("track")
-        recco_id = spotify_to_recco(t["id"])
-        if t and t.get("id") and recco_id: # track may be unavailable, in spotify or recco
-            tracks.append(recco_id)
-    return tracks
+    return [item["track"]["id"] for item in res["items"] if item.get("track") and item["track"].get("id")]
+
+def fetch_features(track_id): # reccobeats features for a spotify track id, or None
+    recco_id = spotify_to_recco(track_id)
+    if not recco_id: # track may be unavailable in recco
+        return None
+    resp = requests.get(f"{BASE_URL}/v1/track/{recco_id}/audio-features", timeout=30)
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    data = resp.json()
+    feats = [data.get(f) for f in features]
+    return None if None in feats else feats
 
 def get_features(playlist_id, weather_label):
     track_ids = playlist_to_tracks(playlist_id)
-    rows = []
-    for id in track_ids:
-        url = f"{BASE_URL}/v1/track/{id}/audio-features"
-        resp = requests.get(url, timeout=30)
-        if resp.status_code == 404:
-            continue 
-        resp.raise_for_status()
-        data = resp.json()
-        rows.append({"weather": weather_label, **{f: data.get(f) for f in features}})
-    return pd.DataFrame(rows)
+    known = store.get_many(track_ids)
+    fetched = [(id, fetch_features(id)) for id in track_ids if id not in known]
+    store.upsert_many([(id, feats) for id, feats in fetched if feats is not None])
+    known.update((id, feats) for id, feats in fetched if feats is not None)
+    labelled = [id for id in track_ids if id in known]
+    store.label_many([(id, weather_label) for id in labelled], source=f"playlist:{playlist_id}")
+    print(f"{weather_label}: {len(labelled)} tracks, {len(fetched)} fetched, {len(track_ids) - len(fetched)} already stored")
+    return pd.DataFrame([{"weather": weather_label, **dict(zip(features, known[id]))} for id in labelled])
 
 df = pd.DataFrame()
 
@@ -71,10 +90,14 @@ def add_to_df(playlist_id, weather_label):
     df_feats = get_features(playlist_id, weather_label)
     df = pd.concat([df, df_feats], ignore_index=True)
 
-add_to_df(rain_id, "rainy")
-add_to_df(sun_id, "sunny")
-add_to_df(cloud_id, "cloudy")
-add_to_df(snow_id, "snowy")
+if discovered is not None:
+    for (playlist_id, weather_label), _ in discovered.groupby(["playlist_id", "weather"], sort=False):
+        add_to_df(playlist_id, weather_label)
+else:
+    add_to_df(rain_id, "rainy")
+    add_to_df(sun_id, "sunny")
+    add_to_df(cloud_id, "cloudy")
+    add_to_df(snow_id, "snowy")
 
-df.to_csv("data/ryan.csv", index=False)
+print(f"{len(df)} labelled tracks in {store.path}")
 #csv with columns weather, energy, valence, tempo, acousticness, loudness
\ No newline at end of file
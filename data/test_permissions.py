@@ -1,9 +1,15 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
 
+# Discovery step for the collection pipeline: checks every candidate playlist
+# concurrently and, for the accessible ones, fetches the full track listing in
+# the same request sequence. Listings go to data/playlist_tracks.csv, which
+# data/spotify_data_personal.py reads instead of fetching the playlists again
+
 load_dotenv()
 
 sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
@@ -24,15 +30,45 @@ snow_ids = ["37i9dQZF1EIg6jLXpdBRnL",
             "37i9dQZF1DX0Yxoavh5qJV",
             "37i9dQZF1E8M5ITb7fWzqZ"]
 
-def can_access_playlist(sp, playlist_id):
+MAX_WORKERS = 8
+OUTPUT_PATH = "data/playlist_tracks.csv"
+
+def fetch_playlist_tracks(sp, playlist_id): # all track ids, or raises if not accessible
+    page = sp.playlist_items(playlist_id, limit=100, additional_types=["track"])
+    track_ids = []
+    while page:
+        track_ids.extend(
+            item["track"]["id"] for item in page["items"]
+            if item.get("track") and item["track"].get("id")
+        )
+        page = sp.next(page) if page.get("next") else None
+    return track_ids
+
+def discover(sp, playlist_id, weather):
     try:
-        sp.playlist_items(playlist_id, limit=1)
-        return True
+        return playlist_id, weather, fetch_playlist_tracks(sp, playlist_id), None
+    except spotipy.SpotifyException as e: # 403/404: private, deleted or region-locked
+        return playlist_id, weather, [], f"HTTP {e.http_status}: {e.msg}"
     except Exception as e:
-        return False
+        return playlist_id, weather, [], str(e)
 
-for id in rain_ids + sun_ids + cloud_ids + snow_ids:
-    if can_access_playlist(sp, id):
-        print("Accessible")
+candidates = (
+    [(id, "rainy") for id in rain_ids]
+    + [(id, "sunny") for id in sun_ids]
+    + [(id, "cloudy") for id in cloud_ids]
+    + [(id, "snowy") for id in snow_ids]
+)
+
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+    results = list(pool.map(lambda candidate: discover(sp, *candidate), candidates))
+
+rows = []
+for playlist_id, weather, track_ids, error in results:
+    if error is None:
+        print(f"Accessible      {playlist_id} ({weather}): {len(track_ids)} tracks")
+        rows.extend({"playlist_id": playlist_id, "weather": weather, "track_id": id} for id in track_ids)
     else:
-        print("Not accessible")
\ No newline at end of file
+        print(f"Not accessible  {playlist_id} ({weather}): {error}")
+
+pd.DataFrame(rows, columns=["playlist_id", "weather", "track_id"]).to_csv(OUTPUT_PATH, index=False)
+print(f"Wrote {len(rows)} tracks from {sum(r[3] is None for r in results)}/{len(results)} playlists to {OUTPUT_PATH}")
@@ -0,0 +1,68 @@
+import argparse
+import os
+import time
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from data import load_data
+from distill import synthetic_samples
+from evaluate import measure_latency, score_f1
+from models import gradient_boosting, hist_gradient_boosting
+from train import train_models
+
+# Fit time, predict latency and holdout F1 of gradient_boosting() vs
+# hist_gradient_boosting(), with the training split scaled up by jittered
+# copies to stand in for a larger corpus (the holdout is always real tracks),
+# plus train_models() sequential vs parallel.
+# Run from the repo root:
+#   python ml/bench_training.py [--scales 1 10]
+
+FACTORIES = {
+    "Gradient Boosting": gradient_boosting,
+    "Hist Gradient Boosting": hist_gradient_boosting,
+}
+
+
+def scaled(X: pd.DataFrame, y: pd.Series, factor: int) -> tuple[pd.DataFrame, pd.Series]:
+    if factor <= 1:
+        return X, y
+    extra = synthetic_samples(X, factor - 1, noise=0.05)
+    labels = y.repeat(factor - 1).reset_index(drop=True)
+    return pd.concat([X, extra], ignore_index=True), pd.concat([y, labels], ignore_index=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="corpus size multipliers")
+    args = parser.parse_args()
+
+    X, y = load_data()
+    print(f"{os.cpu_count()} CPU cores")
+
+    # TRAIN_MODELS: SEQUENTIAL VS PARALLEL
+    for n_jobs in (1, -1):
+        start = time.perf_counter()
+        train_models(X, y, n_jobs=n_jobs)
+        print(f"train_models(n_jobs={n_jobs}): {time.perf_counter() - start:.2f}s")
+
+    # BOOSTING: FIT, PREDICT, F1
+    results = []
+    X_real, X_test, y_real, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    for factor in args.scales:
+        X_train, y_train = scaled(X_real, y_real, factor)
+        print(f"\n{len(X_train)} training rows ({factor}x)")
+        for name, factory in FACTORIES.items():
+            start = time.perf_counter()
+            model = factory().fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+            f1 = score_f1(name, model, X_test, y_test)
+            single, batch = measure_latency(name, model, X_test)
+            results.append((len(X_train), name, fit_seconds, single, batch, f1))
+
+    print(f"\n{'rows':>8} {'model':<24}{'fit':>9}{'us/request':>12}{'us/row':>9}{'F1':>8}")
+    for rows, name, fit_seconds, single, batch, f1 in results:
+        print(f"{rows:>8} {name:<24}{fit_seconds:>8.2f}s{single * 1e6:>12.1f}{batch * 1e6:>9.2f}{f1:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.metrics import f1_score
+from sklearn.model_selection import cross_val_predict
+
+from data import load_data
+from evaluate import build_cv
+from models import naive_bayes, logistic_regression, poly_logistic, gradient_boosting
+
+# Picks the confidence threshold for the serving cascade (backend/app/cascade.py):
+# the fast model answers when its top probability reaches the threshold, the
+# rest escalate to gradient_boosting(). Chosen on out-of-fold predictions from
+# the same folds evaluate.py uses. Run from the repo root:
+#   python ml/cascade.py [--fast logistic_regression] [--tolerance 0.005]
+
+FAST_MODELS = {
+    "naive_bayes": naive_bayes,
+    "logistic_regression": logistic_regression,
+    "poly_logistic": poly_logistic,
+}
+
+
+# THRESHOLD SWEEP
+def sweep(fast_proba, full_proba, classes, y, thresholds) -> list[dict]:
+    fast_pred = classes[fast_proba.argmax(axis=1)]
+    full_pred = classes[full_proba.argmax(axis=1)]
+    confidence = fast_proba.max(axis=1)
+    rows = []
+    for threshold in thresholds:
+        escalate = confidence < threshold
+        cascade_pred = np.where(escalate, full_pred, fast_pred)
+        rows.append({
+            "threshold": float(threshold),
+            "escalated": float(escalate.mean()),
+            "f1": float(f1_score(y, cascade_pred, average="weighted")),
+            "agreement": float(np.mean(cascade_pred == full_pred)),
+        })
+    return rows
+
+
+def pick_threshold(rows: list[dict], full_f1: float, tolerance: float) -> dict:
+    # Least escalation that stays within tolerance of the full model's F1;
+    # the highest threshold always escalates everything, so one qualifies
+    ok = [row for row in rows if row["f1"] >= full_f1 - tolerance]
+    return min(ok, key=lambda row: (row["escalated"], -row["f1"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fast", choices=sorted(FAST_MODELS), default="logistic_regression")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="F1 the cascade may give up vs the full model")
+    args = parser.parse_args()
+
+    X, y = load_data()
+    cv = build_cv(y)
+
+    # OUT-OF-FOLD PROBABILITIES
+    fast_proba = cross_val_predict(FAST_MODELS[args.fast](), X, y, cv=cv, method="predict_proba")
+    full_proba = cross_val_predict(gradient_boosting(), X, y, cv=cv, method="predict_proba")
+    classes = np.unique(y)
+    full_f1 = f1_score(y, classes[full_proba.argmax(axis=1)], average="weighted")
+    fast_f1 = f1_score(y, classes[fast_proba.argmax(axis=1)], average="weighted")
+    print(f"Out-of-fold F1: {args.fast} {fast_f1:.4f}, gradient_boosting {full_f1:.4f}")
+
+    thresholds = np.append(np.round(np.arange(0.30, 1.0, 0.05), 2), 1.01)
+    rows = sweep(fast_proba, full_proba, classes, y, thresholds)
+    print(f"{'threshold':>9} {'escalated':>9} {'F1':>7} {'agree':>7}")
+    for row in rows:
+        print(f"{row['threshold']:>9.2f} {row['escalated']:>9.1%} {row['f1']:>7.4f} {row['agreement']:>7.1%}")
+    chosen = pick_threshold(rows, full_f1, args.tolerance)
+    print(
+        f"Chosen threshold {chosen['threshold']:.2f}: {chosen['escalated']:.1%} of rows escalate, "
+        f"F1 {chosen['f1']:.4f} vs {full_f1:.4f}"
+    )
+
+    # EXPORT: fast model refit on all tracks, config next to model.pkl
+    models_dir = Path("backend/models")
+    models_dir.mkdir(parents=True, exist_ok=True)
+    fast = FAST_MODELS[args.fast]().fit(X, y)
+    joblib.dump(fast, models_dir / "cascade_fast.pkl")
+    config = {
+        "fast_model": "cascade_fast.pkl",
+        "fast_kind": args.fast,
+        "threshold": chosen["threshold"],
+        "validation": {"full_f1": float(full_f1), "fast_f1": float(fast_f1), **chosen},
+    }
+    (models_dir / "cascade.json").write_text(json.dumps(config, indent=2))
+    print(f"Saved {models_dir / 'cascade_fast.pkl'} and {models_dir / 'cascade.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+# Flattens a fitted scaler + tree ensemble pipeline into float32/int32 arrays
+# Read back by backend/app/compact_model.py, which needs only numpy
+
+FORMAT_VERSION = 1
+
+
+def _float32_floor(thresholds: np.ndarray) -> np.ndarray:
+    # Trees compare float32 features against float64 thresholds, so rounding a
+    # threshold down to the nearest float32 keeps every split decision exact
+    rounded = thresholds.astype(np.float32)
+    too_high = rounded.astype(np.float64) > thresholds
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _flatten_trees(trees, leaf_values) -> dict[str, np.ndarray]:
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    left = np.concatenate([tree.children_left for tree in trees])
+    right = np.concatenate([tree.children_right for tree in trees])
+    # Child indices become global so all trees live in one node table
+    for i, tree in enumerate(trees):
+        nodes = slice(offsets[i], offsets[i + 1])
+        left[nodes] = np.where(left[nodes] >= 0, left[nodes] + offsets[i], -1)
+        right[nodes] = np.where(right[nodes] >= 0, right[nodes] + offsets[i], -1)
+    return {
+        "roots": offsets[:-1].astype(np.int32),
+        "left": left.astype(np.int32),
+        "right": right.astype(np.int32),
+        "feature": np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.int8),
+        "threshold": _float32_floor(np.concatenate([tree.threshold for tree in trees])),
+        "value": np.concatenate(leaf_values).astype(np.float32),
+        "max_depth": np.int32(max(tree.max_depth for tree in trees)),
+    }
+
+
+def compact_arrays(pipeline) -> dict[str, np.ndarray]:
+    scaler = pipeline.named_steps["scaler"]
+    classifier = pipeline.named_steps["classifier"]
+    arrays = {
+        "format_version": np.int32(FORMAT_VERSION),
+        "classes": np.asarray(classifier.classes_).astype(str),
+        # Five values each, so the scaler stays float64 like sklearn's
+        "mean": scaler.mean_.astype(np.float64),
+        "scale": scaler.scale_.astype(np.float64),
+    }
+
+    if isinstance(classifier, GradientBoostingClassifier):
+        # estimators_ is (stages, K); tree (stage, k) adds to class k's raw score
+        stages, k = classifier.estimators_.shape
+        trees = [classifier.estimators_[s, j].tree_ for s in range(stages) for j in range(k)]
+        arrays.update(_flatten_trees(trees, [tree.value[:, 0, 0] for tree in trees]))
+        arrays["kind"] = np.array("gradient_boosting")
+        arrays["tree_class"] = np.tile(np.arange(k), stages).astype(np.int32)
+        arrays["learning_rate"] = np.float32(classifier.learning_rate)
+        # The prior init is the same for every row, so one raw row is enough
+        init = classifier._raw_predict_init(np.zeros((1, classifier.n_features_in_), dtype=np.float32))
+        arrays["init"] = init[0].astype(np.float32)
+    elif isinstance(classifier, RandomForestClassifier):
+        trees = [estimator.tree_ for estimator in classifier.estimators_]
+        values = [tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True) for tree in trees]
+        arrays.update(_flatten_trees(trees, values))
+        arrays["kind"] = np.array("random_forest")
+    else:
+        raise ValueError(f"compact export supports gradient boosting and random forest, not {type(classifier).__name__}")
+
+    return arrays
@@ -1,9 +1,32 @@
+import os
 import pandas as pd
 
 features = ["energy", "valence", "tempo", "acousticness", "loudness"]
 
-def load_data(path: str = "data/track_data.csv") -> tuple[pd.DataFrame, pd.Series]:
+def load_store_data(store_path: str | None = None) -> pd.DataFrame:
+    # ml/ scripts import siblings directly, the backend imports the ml package
+    try:
+        from feature_store import FeatureStore, default_store_path
+    except ImportError:
+        from ml.feature_store import FeatureStore, default_store_path
+    store_path = store_path or default_store_path()
+    if not os.path.exists(store_path):
+        return pd.DataFrame(columns=["weather", *features])
+    return FeatureStore(store_path).training_frame()
+
+def load_data(path: str = "data/track_data.csv", store_path: str | None = None) -> tuple[pd.DataFrame, pd.Series]:
+    # The committed CSV, plus the labelled tracks in a feature store only when
+    # store_path is given: serving writes to the store, so reading it by
+    # default would make training depend on whatever the server has seen
     df = pd.read_csv(path)
+    stored = load_store_data(store_path) if store_path else pd.DataFrame()
+    if len(stored):
+        df = pd.concat([df, stored[df.columns]], ignore_index=True)
     X = df[features]
     y = df["weather"]
-    return X, y
\ No newline at end of file
+    return X, y
+
+def iter_chunks(path: str = "data/track_data.csv", chunksize: int = 100_000):
+    # (X, y) one chunk at a time, so a corpus larger than memory can be streamed
+    for df in pd.read_csv(path, usecols=["weather", *features], chunksize=chunksize):
+        yield df[features], df["weather"]
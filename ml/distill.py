@@ -0,0 +1,97 @@
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from data import load_data, features
+from evaluate import measure_latency, score_f1
+from models import poly_logistic
+
+# Distills the deployed model (backend/models/model.pkl, the teacher) into
+# poly_logistic() (the surrogate). The surrogate learns the teacher's class
+# probabilities, not the hard labels, on the real tracks plus synthetic ones
+# around them. Only surrogate.pkl is written. Run from the repo root:
+#   python ml/distill.py [--teacher backend/models/model.pkl] [--degree 3] [--synthetic 4]
+
+BOUNDED = ["energy", "valence", "acousticness"]
+
+
+# SYNTHETIC SAMPLES
+def synthetic_samples(X: pd.DataFrame, per_row: int, noise: float = 0.15, random_state: int = 42) -> pd.DataFrame:
+    # Jitter real tracks by a fraction of each feature's spread so the surrogate
+    # sees the teacher's decision surface between and around training points
+    rng = np.random.default_rng(random_state)
+    base = np.repeat(X.to_numpy(), per_row, axis=0)
+    jittered = base + rng.normal(0.0, noise, base.shape) * X.std().to_numpy()
+    samples = pd.DataFrame(jittered, columns=features)
+    samples[BOUNDED] = samples[BOUNDED].clip(0.0, 1.0)
+    samples["tempo"] = samples["tempo"].clip(lower=1.0)
+    samples["loudness"] = samples["loudness"].clip(upper=0.0)
+    return samples
+
+
+# SOFT-LABEL FIT
+def fit_surrogate(surrogate, teacher, X: pd.DataFrame, per_row: int):
+    # LogisticRegression takes no probability targets, so each sample appears
+    # once per class, weighted by the teacher's probability for that class
+    X_all = pd.concat([X, synthetic_samples(X, per_row)], ignore_index=True)
+    probabilities = teacher.predict_proba(X_all)
+    classes = teacher.classes_
+    X_rep = X_all.loc[X_all.index.repeat(len(classes))].reset_index(drop=True)
+    y_rep = np.tile(classes, len(X_all))
+    surrogate.fit(X_rep, y_rep, classifier__sample_weight=probabilities.ravel())
+    return surrogate
+
+
+def agreement(teacher, surrogate, X) -> float:
+    return float(np.mean(teacher.predict(X) == surrogate.predict(X)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--degree", type=int, default=3, help="polynomial expansion degree of the surrogate")
+    parser.add_argument("--synthetic", type=int, default=4, help="synthetic samples per real track")
+    parser.add_argument("--teacher", default="backend/models/model.pkl", help="fitted model to distill (written by ml/export_model.py)")
+    args = parser.parse_args()
+
+    teacher_path = Path(args.teacher)
+    if not teacher_path.exists():
+        parser.error(f"{teacher_path} not found; run python ml/export_model.py first")
+    deployed = joblib.load(teacher_path)
+
+    X, y = load_data()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X,
+        y,
+        test_size=0.2,
+        random_state=42,
+        stratify=y if (y.value_counts() >= 2).all() else None,
+    )
+
+    # HOLDOUT COMPARISON: the deployed teacher has seen the holdout, so a copy
+    # of it is refit on the training split
+    teacher = clone(deployed).fit(X_train, y_train)
+    surrogate = fit_surrogate(poly_logistic(degree=args.degree), teacher, X_train, args.synthetic)
+    hard = poly_logistic(degree=args.degree).fit(X_train, y_train)
+
+    score_f1("Teacher (deployed model)", teacher, X_test, y_test)
+    score_f1("Surrogate (distilled)", surrogate, X_test, y_test)
+    score_f1("Same model, hard labels", hard, X_test, y_test)
+    print(f"Surrogate agrees with teacher on {agreement(teacher, surrogate, X_test):.2%} of holdout tracks")
+    teacher_latency, _ = measure_latency("Teacher", teacher, X_test)
+    surrogate_latency, _ = measure_latency("Surrogate", surrogate, X_test)
+    print(f"Surrogate is {teacher_latency / surrogate_latency:.1f}x faster per request")
+
+    # EXPORT: the surrogate of the deployed teacher, fit on all tracks; the
+    # teacher file is left as it is
+    surrogate = fit_surrogate(poly_logistic(degree=args.degree), deployed, X, args.synthetic)
+    surrogate_path = teacher_path.with_name("surrogate.pkl")
+    joblib.dump(surrogate, surrogate_path)
+    print(f"Saved surrogate of {teacher_path} to {surrogate_path}")
+
+
+if __name__ == "__main__":
+    main()
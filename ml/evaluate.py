@@ -1,3 +1,5 @@
+import timeit
+
 import matplotlib.pyplot as plt
 import pandas as pd
 from sklearn.metrics import ConfusionMatrixDisplay, confusion_matrix, f1_score
@@ -11,11 +13,23 @@ from models import naive_bayes, logistic_regression, random_forest, gradient_boo
 # F1 SCORE
 def evaluate_f1(name: str, model, X_train, X_test, y_train, y_test) -> float:
     model.fit(X_train, y_train)
+    return score_f1(name, model, X_test, y_test)
+
+def score_f1(name: str, model, X_test, y_test) -> float:
     predictions = model.predict(X_test)
     score = f1_score(y_test, predictions, average="weighted")
     print(f"{name} F1 Score: {score:.4f}")
     return score
 
+# PREDICTION LATENCY
+def measure_latency(name: str, model, X, repeats: int = 200) -> tuple[float, float]:
+    # Single-row predict_proba (the /predict path) and per-row cost over all of X
+    row = X.iloc[[0]]
+    single = min(timeit.repeat(lambda: model.predict_proba(row), number=repeats, repeat=3)) / repeats
+    batch = min(timeit.repeat(lambda: model.predict_proba(X), number=3, repeat=3)) / 3 / len(X)
+    print(f"{name} latency: {single * 1e6:.1f} us/request, {batch * 1e6:.2f} us/row batched")
+    return single, batch
+
 # CROSS VALIDATION F1
 def build_cv(y: pd.Series, n_splits: int = 5, random_state: int = 42):
     min_class_count = y.value_counts().min()
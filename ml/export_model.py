@@ -1,20 +1,103 @@
+import argparse
+import subprocess
+import sys
+import time
 import joblib
+import numpy as np
 from pathlib import Path
 
+from compact import compact_arrays
 from data import load_data
-from models import gradient_boosting
+from feature_store import default_store_path
+from lookup_table import export_lookup_table
+from models import gradient_boosting, hist_gradient_boosting
+
+MODELS = {
+    "gradient_boosting": gradient_boosting,
+    "hist_gradient_boosting": hist_gradient_boosting,
+}
+
+# Loads an artifact in a fresh interpreter and prints "<seconds> <peak RSS KB>"
+# Importing what the artifact needs (sklearn for the pickle) is part of the cost
+# ru_maxrss survives exec on Linux, so the peak is read from /proc when possible
+LOAD_PROBE = """
+import re, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1].endswith(".npz"):
+    import numpy as np
+    with np.load(sys.argv[1]) as data:
+        arrays = {name: data[name] for name in data.files}
+else:
+    import joblib
+    model = joblib.load(sys.argv[1])
+elapsed = time.perf_counter() - start
+try:
+    peak_kb = int(re.search(r"VmHWM:\\s+(\\d+)", open("/proc/self/status").read()).group(1))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak_kb)
+"""
+
+
+def probe_load(path: Path) -> tuple[float, int]:
+    out = subprocess.run([sys.executable, "-c", LOAD_PROBE, str(path)], capture_output=True, text=True, check=True)
+    seconds, rss_kb = out.stdout.split()
+    return float(seconds), int(rss_kb)
+
+
+def report(model, model_path: Path, compact_path: Path, X) -> None:
+    print(f"{'artifact':<12}{'size':>12}{'load':>12}{'RSS':>12}")
+    for name, path in (("pickle", model_path), ("compact", compact_path)):
+        seconds, rss_kb = probe_load(path)
+        print(f"{name:<12}{path.stat().st_size / 1024:>10.1f}KB{seconds * 1000:>10.1f}ms{rss_kb / 1024:>10.1f}MB")
+
+    # Imported here so plain exports never need the backend package on the path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from backend.app.compact_model import CompactModel
+
+    compact = CompactModel.load(compact_path)
+    full = model.predict_proba(X)
+    small = compact.predict_proba(X.to_numpy())
+    agreement = np.mean(full.argmax(axis=1) == small.argmax(axis=1))
+    print(f"label agreement {agreement:.2%}, max probability delta {np.abs(full - small).max():.2e}")
 
 
 def main() -> None:
-    X, y = load_data()
-    model = gradient_boosting()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(MODELS), default="gradient_boosting", help="factory in models.py to train")
+    parser.add_argument("--compact", action="store_true", help="also write model.npz with float32 tree arrays")
+    parser.add_argument("--lookup-table", action="store_true", help="also write model_lookup.npy, the model evaluated over a quantized grid")
+    parser.add_argument("--grid-steps", type=int, default=21, help="grid points per feature for --lookup-table")
+    parser.add_argument("--store", nargs="?", const=default_store_path(), help="also train on the labelled tracks in this feature store (default path if no value)")
+    args = parser.parse_args()
+    if args.compact and args.model != "gradient_boosting":
+        parser.error("--compact supports gradient_boosting only")
+
+    X, y = load_data(store_path=args.store)
+    model = MODELS[args.model]()
     model.fit(X, y)
 
     models_dir = Path("backend/models")
     models_dir.mkdir(parents=True, exist_ok=True)
     model_path = models_dir / "model.pkl"
     joblib.dump(model, model_path)
-    print(f"Saved model to {model_path}")
+    print(f"Saved {args.model} model to {model_path}")
+
+    if args.compact:
+        compact_path = models_dir / "model.npz"
+        np.savez(compact_path, **compact_arrays(model))
+        print(f"Saved compact model to {compact_path}")
+        report(model, model_path, compact_path, X)
+
+    if args.lookup_table:
+        table_path = models_dir / "model_lookup.npy"
+        start = time.perf_counter()
+        meta = export_lookup_table(model, X, y, args.grid_steps, table_path)
+        print(f"Saved lookup table to {table_path} ({table_path.stat().st_size / 2**20:.1f}MB, "
+              f"{args.grid_steps}^5 cells, {time.perf_counter() - start:.1f}s)")
+        print(f"lookup agrees with model on {meta['agreement']:.2%} of {meta['holdout_rows']} held-out rows; "
+              f"accuracy {meta['lookup_accuracy']:.4f} vs {meta['model_accuracy']:.4f} "
+              f"(delta {meta['lookup_accuracy'] - meta['model_accuracy']:+.4f})")
 
 
 if __name__ == "__main__":
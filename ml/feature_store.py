@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+# One on-disk table of audio features keyed by Spotify track ID, shared by
+# data collection, training (ml/data.py) and serving (SpotifyService)
+# so each track's features are fetched from Reccobeats once
+
+# Same order as ml/data.py; kept here so the backend can import this module alone
+features = ["energy", "valence", "tempo", "acousticness", "loudness"]
+
+# SQLite's default limit on bound parameters is 999
+MAX_PARAMS = 500
+
+
+def default_store_path() -> str:
+    return os.getenv("FORECAST_FEATURE_STORE") or str(Path(__file__).resolve().parent.parent / "data" / "features.sqlite3")
+
+
+class FeatureStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_store_path()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        columns = ", ".join(f"{name} REAL NOT NULL" for name in features)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS features (track_id TEXT PRIMARY KEY, {columns}, "
+            "source TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS labels (track_id TEXT NOT NULL, weather TEXT NOT NULL, "
+            "source TEXT NOT NULL, PRIMARY KEY (track_id, source))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't cross threads or forks
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, track_ids: Sequence[str]) -> dict[str, tuple]:
+        found = {}
+        track_ids = list(dict.fromkeys(track_ids))
+        for start in range(0, len(track_ids), MAX_PARAMS):
+            chunk = track_ids[start:start + MAX_PARAMS]
+            rows = self._conn().execute(
+                f"SELECT track_id, {', '.join(features)} FROM features "
+                f"WHERE track_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update((row[0], tuple(row[1:])) for row in rows)
+        return found
+
+    def get(self, track_id: str) -> Optional[tuple]:
+        return self.get_many([track_id]).get(track_id)
+
+    def upsert_many(self, rows: Iterable[tuple[str, Sequence[float]]], source: str = "reccobeats") -> int:
+        now = time.time()
+        values = [(track_id, *map(float, feats), source, now) for track_id, feats in rows]
+        if not values:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO features (track_id, {', '.join(features)}, source, updated_at) "
+                f"VALUES ({', '.join('?' * (len(features) + 3))})",
+                values,
+            )
+        return len(values)
+
+    def label_many(self, rows: Iterable[tuple[str, str]], source: str) -> int:
+        values = [(track_id, weather, source) for track_id, weather in rows]
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO labels (track_id, weather, source) VALUES (?, ?, ?)", values)
+        return len(values)
+
+    def training_frame(self):
+        # Labelled tracks joined with their features, in the track_data.csv layout
+        # pandas is only imported here so serving can use the store without it
+        import pandas as pd
+
+        # One row per track: labels are keyed by (track_id, source), so a track
+        # can carry several; curated playlist labels beat user feedback, then
+        # the most recent label wins
+        return pd.read_sql_query(
+            f"SELECT l.weather, {', '.join('f.' + name for name in features)} "
+            "FROM (SELECT track_id, weather, rowid AS seq, ROW_NUMBER() OVER ("
+            "PARTITION BY track_id ORDER BY source = 'feedback', rowid DESC) AS pick FROM labels) l "
+            "JOIN features f ON f.track_id = l.track_id WHERE l.pick = 1 ORDER BY l.seq",
+            self._conn(),
+        )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM features").fetchone()[0]
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from data import features
+
+# Precomputes the model over a quantized grid of the five inputs so serving
+# can answer /predict by indexing (backend/app/lookup_table.py reads it)
+
+CHUNK_ROWS = 250_000
+
+# Training rows whose probabilities identify the model a table was built from
+FINGERPRINT_ROWS = 32
+
+
+def grid_axes(X: pd.DataFrame, steps: int) -> list[np.ndarray]:
+    # Grid points at training-data quantiles rather than evenly spaced: the
+    # resolution goes where tracks actually are. Inputs beyond the first or
+    # last point use the edge cell
+    return [np.unique(np.quantile(X[name], np.linspace(0, 1, steps))) for name in features]
+
+
+def build_table(model, axes: list[np.ndarray]) -> np.ndarray:
+    # Probabilities stored as uint8 (p * 255): 4 bytes per cell for 4 classes
+    shape = tuple(len(axis) for axis in axes)
+    n_cells = int(np.prod(shape))
+    table = np.empty((n_cells, len(model.classes_)), dtype=np.uint8)
+    for start in range(0, n_cells, CHUNK_ROWS):
+        cells = np.arange(start, min(start + CHUNK_ROWS, n_cells))
+        index = np.unravel_index(cells, shape)
+        grid = pd.DataFrame({name: axes[i][index[i]] for i, name in enumerate(features)})
+        table[cells] = np.rint(model.predict_proba(grid) * 255).astype(np.uint8)
+    return table.reshape(shape + (len(model.classes_),))
+
+
+def lookup(table: np.ndarray, axes: list[np.ndarray], X: pd.DataFrame) -> np.ndarray:
+    # Nearest grid point per feature: a binary search over the cell midpoints
+    index = tuple(
+        np.searchsorted((axis[1:] + axis[:-1]) / 2, X[name].to_numpy(dtype=np.float64))
+        for axis, name in zip(axes, features)
+    )
+    return table[index]
+
+
+def model_fingerprint(model, X: pd.DataFrame) -> dict:
+    # Probabilities for a fixed sample of rows. Serving recomputes them with the
+    # model it loaded and refuses the table if they differ, whether that model
+    # came from the pickle or the compact export
+    probe = X.sample(n=min(FINGERPRINT_ROWS, len(X)), random_state=0)
+    return {
+        "rows": probe.to_numpy(dtype=np.float64).tolist(),
+        "probabilities": model.predict_proba(probe).tolist(),
+    }
+
+
+def holdout_metrics(model, X: pd.DataFrame, y: pd.Series, steps: int) -> dict:
+    # Lookup vs full model on tracks neither saw: a copy of the model and its
+    # grid are fit on 80% of the rows and scored on the other 20%. Scoring the
+    # rows the shipped model was fit on would flatter both
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    held_out = clone(model).fit(X_train, y_train)
+    axes = grid_axes(X_train, steps)
+    table = build_table(held_out, axes)
+    classes = np.asarray(held_out.classes_)
+    full = held_out.predict(X_test)
+    quantized = classes[lookup(table, axes, X_test).argmax(axis=1)]
+    return {
+        "agreement": float(np.mean(full == quantized)),
+        "model_accuracy": float(np.mean(full == y_test.to_numpy())),
+        "lookup_accuracy": float(np.mean(quantized == y_test.to_numpy())),
+        "holdout_rows": len(X_test),
+    }
+
+
+def export_lookup_table(model, X: pd.DataFrame, y: pd.Series, steps: int, path: Path) -> dict:
+    axes = grid_axes(X, steps)
+    table = build_table(model, axes)
+    np.save(path, table)
+
+    meta = {
+        "features": features,
+        "axes": [axis.tolist() for axis in axes],
+        "classes": [str(c) for c in model.classes_],
+        "model_fingerprint": model_fingerprint(model, X),
+        **holdout_metrics(model, X, y, steps),
+    }
+    path.with_suffix(".json").write_text(json.dumps(meta, indent=2))
+    return meta
@@ -0,0 +1,57 @@
+import argparse
+import json
+import joblib
+import pandas as pd
+from pathlib import Path
+
+from data import load_data, features
+from evaluate import build_cv, cross_validate
+from models import sgd_logistic
+
+# Bootstraps the model the backend updates online from /feedback
+# (backend/app/feedback.py): trained once on the full corpus plus all feedback
+# so far, after which only feedback logged since is folded in with partial_fit.
+# Serve it with FORECAST_MODEL_FILE=online_model.pkl and
+# FORECAST_FEEDBACK_UPDATE_MINUTES set. Run from the repo root:
+#   python ml/online.py [--feedback backend/models/feedback.jsonl]
+
+
+def load_feedback(path: Path) -> tuple[pd.DataFrame, pd.Series, int]:
+    # Feedback rows plus the byte offset the backend should resume from
+    if not path.exists():
+        return pd.DataFrame(columns=features), pd.Series(dtype=str), 0
+    data = path.read_bytes()
+    end = data.rfind(b"\n") + 1
+    entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    X = pd.DataFrame([e["features"] for e in entries], columns=features)
+    y = pd.Series([e["weather"] for e in entries], dtype=str)
+    return X, y, end
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feedback", default="backend/models/feedback.jsonl")
+    parser.add_argument("--output", default="backend/models/online_model.pkl")
+    args = parser.parse_args()
+
+    X, y = load_data()
+    X_feedback, y_feedback, offset = load_feedback(Path(args.feedback))
+    if len(X_feedback):
+        X = pd.concat([X, X_feedback], ignore_index=True)
+        y = pd.concat([y, y_feedback], ignore_index=True)
+    print(f"Training on {len(X)} tracks ({len(X_feedback)} from feedback)")
+
+    cross_validate("SGD Logistic Regression", sgd_logistic(), X, y, build_cv(y))
+
+    # EXPORT: the model carries the offset of the feedback already included,
+    # which the backend's updater reads and advances with every swap
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    model = sgd_logistic().fit(X, y)
+    model.feedback_state_ = {"offset": offset, "applied": len(X_feedback)}
+    joblib.dump(model, output)
+    print(f"Saved {output}; online updates resume from byte {offset} of {args.feedback}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data import features
+
+# Scores a file of tracks with the exported model: the model is loaded once
+# (per worker process), the input is streamed in chunks and each chunk is one
+# vectorized predict_proba call. Output keeps the input's other columns and
+# adds predicted_weather plus one probability column per class. CSV or Parquet
+# (Parquet needs pyarrow). Run from the repo root:
+#   python ml/score_batch.py tracks.csv scored.csv [--workers 4] [--chunksize 100000]
+
+_model = None
+
+
+def load_model(path: str):
+    # .npz is the compact export; evaluating it needs only numpy
+    if path.endswith(".npz"):
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from backend.app.compact_model import CompactModel
+
+        return CompactModel.load(path)
+    return joblib.load(path)
+
+
+def init_worker(model_path: str) -> None:
+    global _model
+    _model = load_model(model_path)
+
+
+# CHUNK SCORING
+def score_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    X = df[features]
+    probabilities = _model.predict_proba(X.to_numpy(dtype=np.float64) if hasattr(_model, "mean_") else X)
+    classes = [str(c) for c in _model.classes_]
+    out = df.drop(columns=features)
+    out["predicted_weather"] = np.asarray(classes)[probabilities.argmax(axis=1)]
+    for i, label in enumerate(classes):
+        out[f"p_{label}"] = probabilities[:, i].round(6)
+    return out
+
+
+# INPUT / OUTPUT
+def read_chunks(path: Path, chunksize: int):
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.parquet = None
+        self.first = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.path.suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self.first else "a", header=self.first, index=False)
+        self.first = False
+
+    def close(self) -> None:
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+def score_file(input_path: Path, output_path: Path, model_path: str, chunksize: int, workers: int) -> int:
+    writer = ChunkWriter(output_path)
+    rows = 0
+    try:
+        if workers <= 1:
+            init_worker(model_path)
+            for chunk in read_chunks(input_path, chunksize):
+                writer.write(score_chunk(chunk))
+                rows += len(chunk)
+            return rows
+
+        # At most two chunks in flight per worker, so memory stays bounded
+        # however large the file; results are written in input order
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_path,)) as pool:
+            pending = deque()
+            for chunk in read_chunks(input_path, chunksize):
+                if len(pending) >= 2 * workers:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+                pending.append(pool.submit(score_chunk, chunk))
+            while pending:
+                scored = pending.popleft().result()
+                writer.write(scored)
+                rows += len(scored)
+        return rows
+    finally:
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="CSV or .parquet file with the five feature columns")
+    parser.add_argument("output", help="CSV or .parquet file to write")
+    parser.add_argument("--model", default="backend/models/model.pkl", help="exported model (.pkl or compact .npz)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows scored per call")
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes; 1 scores in this process")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = score_file(Path(args.input), Path(args.output), args.model, args.chunksize, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} tracks in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
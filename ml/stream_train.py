@@ -0,0 +1,134 @@
+import argparse
+import re
+import resource
+import time
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.metrics import confusion_matrix
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from data import iter_chunks
+from models import naive_bayes, sgd_logistic
+
+# Out-of-core training: the CSV is read in chunks and never held in memory
+# whole, so the corpus size is bounded by disk rather than RAM. Pass 1 fits
+# the scaler incrementally, later passes train the models that support
+# partial_fit. Every `holdout_every`-th row is held out for scoring. SGD
+# shuffles within a chunk only, so shuffle a label-sorted file once beforehand.
+# Run from the repo root:
+#   python ml/stream_train.py [--path data/track_data.csv] [--chunksize 100000] [--epochs 10]
+
+STREAMING_MODELS = {
+    "SGD Logistic Regression": sgd_logistic,
+    "Naive Bayes": naive_bayes,
+}
+
+
+def peak_rss_mb() -> float:
+    # VmHWM is this process's own peak; ru_maxrss is the fallback off Linux
+    try:
+        return int(re.search(r"VmHWM:\s+(\d+)", open("/proc/self/status").read()).group(1)) / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def split_chunk(X, y, start: int, holdout_every: int):
+    # Holdout membership by global row number, so it is the same rows every pass
+    held = (np.arange(start, start + len(X)) % holdout_every) == 0
+    return X[~held], y[~held], X[held], y[held]
+
+
+# PASS 1: SCALER AND CLASSES
+def fit_scaler(path: str, chunksize: int, holdout_every: int) -> tuple[StandardScaler, np.ndarray, int]:
+    scaler = StandardScaler()
+    classes = set()
+    rows = 0
+    for X, y in iter_chunks(path, chunksize):
+        X_train, y_train, _, _ = split_chunk(X, y, rows, holdout_every)
+        scaler.partial_fit(X_train)
+        classes.update(y_train.unique())
+        rows += len(X)
+    return scaler, np.array(sorted(classes)), rows
+
+
+# LATER PASSES: PARTIAL_FIT
+def train_epoch(classifiers: dict, scaler, classes, path: str, chunksize: int, holdout_every: int, epoch: int) -> int:
+    rows = 0
+    for X, y in iter_chunks(path, chunksize):
+        X_train, y_train, _, _ = split_chunk(X, y, rows, holdout_every)
+        X_scaled = scaler.transform(X_train)
+        for name, classifier in classifiers.items():
+            # Naive Bayes sufficient statistics are exact after one pass
+            if epoch > 0 and name == "Naive Bayes":
+                continue
+            classifier.partial_fit(X_scaled, y_train.to_numpy(), classes=classes)
+        rows += len(X)
+    return rows
+
+
+# HOLDOUT F1 FROM STREAMED CONFUSION MATRICES
+def weighted_f1(matrix: np.ndarray) -> float:
+    support = matrix.sum(axis=1)
+    predicted = matrix.sum(axis=0)
+    true_positive = np.diag(matrix)
+    precision = np.divide(true_positive, predicted, out=np.zeros(len(matrix)), where=predicted > 0)
+    recall = np.divide(true_positive, support, out=np.zeros(len(matrix)), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(matrix)), where=precision + recall > 0)
+    return float((f1 * support).sum() / support.sum())
+
+
+def evaluate(pipelines: dict, classes, path: str, chunksize: int, holdout_every: int) -> dict[str, float]:
+    matrices = {name: np.zeros((len(classes), len(classes)), dtype=np.int64) for name in pipelines}
+    rows = 0
+    for X, y in iter_chunks(path, chunksize):
+        _, _, X_held, y_held = split_chunk(X, y, rows, holdout_every)
+        rows += len(X)
+        if not len(X_held):
+            continue
+        for name, pipeline in pipelines.items():
+            matrices[name] += confusion_matrix(y_held, pipeline.predict(X_held), labels=classes)
+    return {name: weighted_f1(matrix) for name, matrix in matrices.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="data/track_data.csv")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows read per chunk")
+    parser.add_argument("--epochs", type=int, default=10, help="passes over the data for SGD")
+    parser.add_argument("--holdout-every", type=int, default=5, help="hold out every n-th row for scoring")
+    parser.add_argument("--output", default="backend/models/stream_model.pkl", help="where the best model is saved")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    scaler, classes, rows = fit_scaler(args.path, args.chunksize, args.holdout_every)
+    elapsed = time.perf_counter() - started
+    print(f"Scaler pass: {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), classes {[str(c) for c in classes]}")
+
+    classifiers = {name: factory().named_steps["classifier"] for name, factory in STREAMING_MODELS.items()}
+    for epoch in range(args.epochs):
+        started = time.perf_counter()
+        train_epoch(classifiers, scaler, classes, args.path, args.chunksize, args.holdout_every, epoch)
+        elapsed = time.perf_counter() - started
+        print(f"Epoch {epoch + 1}: {rows / elapsed:,.0f} rows/s, peak RSS {peak_rss_mb():.0f}MB")
+
+    # Same Pipeline layout as models.py, so the backend loads it like model.pkl
+    pipelines = {
+        name: Pipeline(steps=[("scaler", scaler), ("classifier", classifier)])
+        for name, classifier in classifiers.items()
+    }
+    scores = evaluate(pipelines, classes, args.path, args.chunksize, args.holdout_every)
+    for name, score in scores.items():
+        print(f"{name} holdout F1 Score: {score:.4f}")
+    print(f"Peak RSS {peak_rss_mb():.0f}MB with chunks of {args.chunksize} rows")
+
+    best = max(scores, key=scores.get)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipelines[best], output)
+    print(f"Saved {best} to {output}")
+
+
+if __name__ == "__main__":
+    main()